@@ -4,6 +4,7 @@ Utility functions for Go board.
 """
 
 import numpy as np
+import random
 
 """
 Encoding of colors on and off a Go board.
@@ -42,6 +43,20 @@ The [0] indexing is needed toextract the result from the singleton tuple.
 def where1d(condition):
     return np.where(condition)[0]
 
+def zobrist_keys(maxpoint):
+    """
+    Random 64-bit keys for Zobrist hashing a board with maxpoint points.
+    Returns (stone_keys, white_to_play_key) where stone_keys[color][point]
+    is the key of a stone of color on point. The EMPTY row is all zero.
+    The random generator is seeded with maxpoint, so every board of the
+    same size gets the same keys, in every process.
+    """
+    rng = random.Random(maxpoint)
+    stone_keys = [tuple([0] * maxpoint)]
+    for color in (BLACK, WHITE):
+        stone_keys.append(tuple(rng.getrandbits(64) for _ in range(maxpoint)))
+    return tuple(stone_keys), rng.getrandbits(64)
+
 def coord_to_point(row, col, boardsize):
     """
     Transform two dimensional (row, col) representation to array index.
@@ -12,13 +12,28 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
 import numpy as np
 import re
 import time
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from pn_search import ProofNumberSearch
+from time_manager import TimeManager, FORCED, CRITICAL
+from simple_board import WIN, BLOCK_WIN, OPEN_FOUR, BLOCK_OPEN_FOUR
 
 INFINITY = 10000000
 
+"""
+Depth stored in the transposition table for a value that does not depend
+on the search horizon, it is valid for a search to any depth.
+"""
+EXHAUSTIVE = 1000
+
+class SearchTimeout(Exception):
+    """ Raised inside the alpha-beta search when the deadline has passed """
+    pass
+
 
 class GtpConnection():
 
-    def __init__(self, go_engine, board, debug_mode = False, time = 1):
+    def __init__(self, go_engine, board, debug_mode = False, time = 1,
+                 tt_size = 2 ** 16):
         """
         Manage a GTP connection for a Go-playing engine
         Parameters
@@ -27,17 +42,29 @@ class GtpConnection():
             a program that can reply to a set of GTP commandsbelow
         board: 
             Represents the current board state.
+        tt_size:
+            Number of buckets of the alpha-beta transposition table.
         """
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
         self.time = time
+        self.time_manager = TimeManager(time)
+        self.tt = TranspositionTable(tt_size)
+        self.solver = "alphabeta"
+        self._deadline = float('inf')
+        self._nodes = 0
+        self._horizon_hits = 0
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
             "name": self.name_cmd,
             "boardsize": self.boardsize_cmd,
             "timelimit":self.timelimit_cmd,
+            "tt_size": self.tt_size_cmd,
+            "solver": self.solver_cmd,
+            "time_settings": self.time_settings_cmd,
+            "time_left": self.time_left_cmd,
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
             "showboard": self.showboard_cmd,
             "clear_board": self.clear_board_cmd,
@@ -69,7 +96,11 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "timelimit": (1, 'Usage: timelimit INT')
+            "timelimit": (1, 'Usage: timelimit INT'),
+            "tt_size": (1, 'Usage: tt_size INT'),
+            "solver": (1, 'Usage: solver {alphabeta,pn}'),
+            "time_settings": (3, 'Usage: time_settings MAIN_TIME BYO_YOMI_TIME BYO_YOMI_STONES'),
+            "time_left": (3, 'Usage: time_left {b,w} TIME STONES')
             #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         }
     
@@ -151,6 +182,7 @@ class GtpConnection():
         Reset the board to empty board of given size
         """
         self.board.reset(size)
+        self.tt.clear()
 
     def board2d(self):
         return str(GoBoardUtil.get_twoD_board(self.board))
@@ -191,105 +223,228 @@ class GtpConnection():
         
     #given the timelimit
     def timelimit_cmd(self, args):
-        
-        assert 1 <= int(args[0]) <= 100
-        self.reset_time(int(args[0])) 
+        """ Set the seconds of genmove and solve, from 1 to 100 """
+        try:
+            seconds = int(args[0])
+        except ValueError:
+            seconds = 0
+        if not 1 <= seconds <= 100:
+            self.error('Usage: timelimit INT')
+            return
+        self.reset_time(seconds)
         #self.respond(self.time)
         self.respond()
 
     def reset_time(self, new_time):
 
         self.time = new_time
-        
+        self.time_manager.move_time = new_time
 
-    def solve_cmd(self, args):
-        
-        #alphabeta_limited_search
-        #evaluation function, heuristic function
+    def time_settings_cmd(self, args):
+        """ Set the game clock: main time, then byo-yomi periods """
+        try:
+            main_time, byo_yomi_time, byo_yomi_stones = \
+                float(args[0]), float(args[1]), int(args[2])
+        except ValueError:
+            main_time = -1
+        if main_time < 0:
+            self.error('Usage: time_settings MAIN_TIME BYO_YOMI_TIME BYO_YOMI_STONES')
+            return
+        self.time_manager.time_settings(main_time, byo_yomi_time,
+                                        byo_yomi_stones)
+        self.respond()
+
+    def time_left_cmd(self, args):
+        """ Set the time left on the clock of color args[0] """
+        try:
+            seconds, stones = float(args[1]), int(args[2])
+        except ValueError:
+            stones = -1
+        if args[0].lower() not in ('b', 'w') or stones < 0:
+            self.error('Usage: time_left {b,w} TIME STONES')
+            return
+        color = color_to_int(args[0].lower())
+        self.time_manager.time_left(color, seconds, stones)
+        self.respond()
+
+    def urgency(self, color):
+        """
+        How much search time the move of color deserves, relative to
+        the others, from the patterns on the board, see time_manager.py.
+        """
+        move_sets = self.board.pattern_move_sets(color)
+        # making an open four wins as surely as making five
+        if move_sets[WIN] or move_sets[BLOCK_WIN] or move_sets[OPEN_FOUR]:
+            return FORCED
+        if move_sets[BLOCK_OPEN_FOUR]:
+            return CRITICAL
+        return 1.0
+
+    def tt_size_cmd(self, args):
+        """
+        Set the number of buckets of the transposition table to args[0]
+        """
+        try:
+            size = int(args[0])
+        except ValueError:
+            size = 0
+        if size < 1:
+            self.error('Usage: tt_size INT')
+            return
+        self.tt = TranspositionTable(size)
+        self.respond()
         
-        start = time.clock()
-        result = self.callAlphabetaDL(4)
-        end = time.clock() - start
 
-        if end > self.time:
-            self.respond("unknown")
+    def solver_cmd(self, args):
+        """
+        Select the search used by solve: alphabeta or pn
+        """
+        if args[0] not in ("alphabeta", "pn"):
+            self.error("unknown solver {}".format(args[0]))
             return
+        self.solver = args[0]
+        self.respond()
+
+    def solve_cmd(self, args):
+        """
+        Solve the current position within the time limit.
+        Responds with the winner and a winning move, the winner only if
+        the player to move loses, "draw" and a drawing move, or "unknown".
+        The number of nodes searched is written to stderr.
+        """
+        start = time.time()
+        if self.solver == "pn":
+            search = ProofNumberSearch(self.board)
+            result = search.solve(start + self.time)
+            nodes = search.nodes
         else:
-                
-            resulting_list = result[1]
-            
-            if resulting_list == []:
-                if result[0] == 0:
-                    self.respond("draw")
-                    return
-                elif result[0] == 1:
-                    if self.board.current_player == 1:
-                        self.respond("b")
-                        return
-                    if self.board.current_player == 2:
-                        self.respond("w")
-                        return
-                elif result[0] == -1:
-                    if GoBoardUtil.opponent(self.board.current_player) == 1:
-                        self.respond("b")
-                        return
-                    if GoBoardUtil.opponent(self.board.current_player) == 2:
-                        self.respond("w")
-                        return
-                    
-            if result[0] == 0: # draw
-                for i in resulting_list:
-                    coords = point_to_coord(i, self.board.size)
-                    ans = format_point(coords)
-                    self.respond("draw  " + ans)
-            elif result[0] == 1: # our win
-                if self.board.current_player == 1:
-                    coords = point_to_coord(resulting_list[0], self.board.size)
-                    ans = format_point(coords)
-                    self.respond("b " + ans)
-                    return
-                if self.board.current_player == 2:
-                    coords = point_to_coord(resulting_list[0], self.board.size)
-                    ans = format_point(coords)
-                    self.respond("w " + ans)
-                    return
-            elif result[0] == -1: # opponent wins
-                if GoBoardUtil.opponent(self.board.current_player) == 1:
-                    coords = point_to_coord(resulting_list[0], self.board.size)
-                    ans = format_point(coords)
-                    self.respond("b")
-                    return  
-                elif GoBoardUtil.opponent(self.board.current_player) == 2:
-                    coords = point_to_coord(resulting_list[0], self.board.size)
-                    ans = format_point(coords)
-                    self.respond("w")
-                    return  
+            result = self.iterative_deepening(start + self.time)
+            nodes = self._nodes
+            if result is not None:
+                value, win_step, proven, _ = result
+                move = win_step[0] if win_step else None
+                result = (value, move) if proven else None
+        seconds = max(time.time() - start, 1e-6)
+        stderr.write("{}: {} nodes in {:.2f}s, {:.0f} nodes/s\n".format(
+            self.solver, nodes, seconds, nodes / seconds))
+        stderr.flush()
+        if result is None:
+            self.respond("unknown")
+            return
+        value, move = result
+        to_play = self.board.current_player
+        if value == -1:
+            self.respond(int_to_color(GoBoardUtil.opponent(to_play)))
             return
+        answer = "draw" if value == 0 else int_to_color(to_play)
+        if move is not None:
+            coords = point_to_coord(move, self.board.size)
+            answer += " " + format_point(coords)
+        self.respond(answer)
+
+    def iterative_deepening(self, deadline):
+        """
+        Run the alpha-beta search to depth 1, 2, 3, ... until the position
+        is solved or the deadline has passed.
+        Every iteration starts with the best moves stored in the
+        transposition table by the previous ones.
+        Returns (value, win_step, proven, depth) of the deepest completed
+        iteration, or None if not even depth 1 could be completed.
+        proven is True if the value is exact, not a horizon estimate.
+        """
+        self._deadline = deadline
+        self._nodes = 0
+        history_length = len(self.board.move_history)
+        result = None
+        max_depth = max(len(self.board.get_empty_points()), 1)
+        try:
+            for depth in range(1, max_depth + 1):
+                self._horizon_hits = 0
+                value, win_step = self.callAlphabetaDL(depth)
+                # a win or loss found before the horizon is a real one
+                proven = value != 0 or self._horizon_hits == 0
+                result = (value, list(win_step), proven, depth)
+                if proven:
+                    break
+        except SearchTimeout:
+            while len(self.board.move_history) > history_length:
+                self.board.pop_move()
+        finally:
+            self._deadline = float('inf')
+        return result
         
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
                
     def alphabetaDL(self, alpha, beta, depth):
         
+        self._nodes += 1
+        if self._nodes & 1023 == 0 and time.time() > self._deadline:
+            raise SearchTimeout()
         moves = self.board.get_empty_points()
         board_full = (len(moves) == 0)   #board full check 
         win_step = []  
-        if self.board.check_game_end_gomoku()[0] or depth == 0 or board_full: #checking end game, no depth, draw
+        if self.board.check_game_end_gomoku()[0] or board_full: #checking end game, draw
             return self.staticallyEvaluateForToPlay() 
-        for move in GoBoardUtil.generate_legal_moves_gomoku(self.board): #moves inlegal move
-            self.board.play_move_gomoku(move, self.board.current_player) #play a stone
+        if depth == 0: # no depth, the value is only a guess
+            self._horizon_hits += 1
+            return 0, []
+        # positions reached by another move order, or by an earlier search
+        key = self.board.hash()
+        entry = self.tt.lookup(key)
+        tt_move = None
+        if entry is not None:
+            _, value, bound, entry_depth, tt_move = entry
+            if entry_depth >= depth:
+                cutoff = None
+                if bound == EXACT:
+                    cutoff = value, [tt_move]
+                elif bound == LOWER and value >= beta:
+                    cutoff = beta, [tt_move]
+                elif bound == UPPER and value <= alpha:
+                    cutoff = alpha, []
+                if cutoff is not None:
+                    if entry_depth < EXHAUSTIVE:
+                        self._horizon_hits += 1
+                    return cutoff
+        alpha_orig = alpha
+        horizon_hits = self._horizon_hits
+        best_move = None
+        legal_moves = self.board.ordered_moves_gomoku()
+        if tt_move in legal_moves:
+            # the best move found before is tried first
+            legal_moves.remove(tt_move)
+            legal_moves.insert(0, tt_move)
+        for move in legal_moves: #moves inlegal move
+            self.board.push_move(move, self.board.current_player) #play a stone
             value = -self.alphabetaDL(-beta, -alpha, depth - 1)[0] #alphabeta search
             if value > alpha:
                 alpha = value
+                best_move = move
                 win_step.clear()
                 win_step.append(move)
                 '''
             if value == alpha:
                 win_step.append(move)'''
-            self.board.undo(move)
+            self.board.pop_move()
             if value >= beta: 
+                self.tt.store(key, beta, LOWER,
+                              self._stored_depth(depth, horizon_hits), move)
                 return beta,win_step # or value in failsoft (later)
-                
+        stored_depth = self._stored_depth(depth, horizon_hits)
+        if alpha > alpha_orig:
+            self.tt.store(key, alpha, EXACT, stored_depth, best_move)
+        else:
+            self.tt.store(key, alpha, UPPER, stored_depth, None)
         return alpha,win_step
+
+    def _stored_depth(self, depth, horizon_hits):
+        """
+        The depth a search result is valid for: any depth if the subtree
+        was searched to the end of the game, otherwise the given depth.
+        """
+        if self._horizon_hits == horizon_hits:
+            return EXHAUSTIVE
+        return depth
     
     # initial call with full window
     
@@ -378,37 +533,38 @@ class GtpConnection():
     def genmove_cmd(self, args):
         """
         Generate a move for the color args[0] in {'b', 'w'}, for the game of gomoku.
+        Plays the best move found by the iterative deepening search within
+        the time given by the time manager, or a random move if the
+        position is lost or nothing was found in time. A search that did
+        not prove its value may get more time, see TimeManager.extension.
         """
         board_color = args[0].lower()
         color = color_to_int(board_color)
         game_end, winner = self.board.check_game_end_gomoku()
-        start = time.clock()
-        result = self.callAlphabetaDL(4)
-        end = time.clock() - start
         if game_end:
             if winner == color:
                 self.respond("pass")
             else:
                 self.respond("resign")
             return
+        self.board.current_player = color
+        start = time.time()
+        empty_points = len(self.board.get_empty_points())
+        budget = self.time_manager.budget(color, empty_points,
+                                          self.urgency(color))
+        result = self.iterative_deepening(start + budget)
+        unproven = 0.5 if result is None or not result[2] else None
+        extra = self.time_manager.extension(color, empty_points, unproven)
+        if extra > 0:
+            result = self.iterative_deepening(time.time() + extra) or result
+        self.time_manager.used(color, time.time() - start)
+        if result is not None and result[0] != -1 and result[1]:
+            move = result[1][0]
         else:
-            #win_moves is a list. If toplayer is losing or draw, it only has None, else is has moves that lead him to win
-            #win_moves = self.solve_cmd(args)
-            win_moves = result[1]
-            if end > self.time or result[0] == -1:
-                move = GoBoardUtil.generate_random_move_gomoku(self.board)
-            if move == PASS:
-                self.respond("pass")
-                return
-        move = win_moves[0]
-        '''
-        if result[0] == -1:
-            #move = self.go_engine.get_move(self.board, color)
             move = GoBoardUtil.generate_random_move_gomoku(self.board)
-            if move == PASS:
-                self.respond("pass")
-                return
-        '''
+        if move == PASS:
+            self.respond("pass")
+            return
         move_coord = point_to_coord(move, self.board.size)
         move_as_string = format_point(move_coord)
         if self.board.is_legal_gomoku(move, color):
@@ -644,6 +800,11 @@ def color_to_int(c):
                     "BORDER": BORDER}
     return color_to_int[c] 
 
+def int_to_color(color):
+    """convert the integer code of a player to its character"""
+    assert color in (BLACK, WHITE)
+    return "b" if color == BLACK else "w"
+
 def overtime(total_time, time):
         
     assert int(total_time) <= int(time)
@@ -0,0 +1,159 @@
+"""
+pn_search.py
+
+Depth-first proof-number search (df-pn) for solving Gomoku positions.
+
+Proof-number search answers a yes/no question: can the attacker force a
+win? The solver asks it twice, once for the player to move and once for
+the opponent, to tell wins, draws and losses apart.
+
+The search is written in negamax form: every node stores (phi, delta),
+the proof and disproof numbers from the point of view of the player to
+move at that node. For a node n with children c:
+    phi(n) = min delta(c)
+    delta(n) = sum phi(c)
+A proven node has phi == 0, a disproven node has delta == 0.
+Nodes are stored in a table keyed on the Zobrist hash of the board
+(SimpleGoBoard.hash), and the moves of a node are generated by
+SimpleGoBoard.ordered_moves_gomoku, so only the forced moves are searched
+when there is a five to make or to block.
+"""
+
+import time
+from board_util import GoBoardUtil
+
+INFINITY = 10000000
+
+class _Timeout(Exception):
+    pass
+
+class ProofNumberSearch(object):
+
+    def __init__(self, board, max_entries = 2 ** 20):
+        """
+        board is searched in place and restored after every search.
+        max_entries bounds the number of positions kept in the table,
+        when it is full the positions that are not solved are dropped.
+        """
+        self.board = board
+        self.max_entries = max_entries
+        self.nodes = 0
+        self._table = {}
+        self._deadline = float('inf')
+
+    def solve(self, deadline):
+        """
+        Solve the position for the player to move.
+        Returns (value, move): value is 1 for a win, 0 for a draw and
+        -1 for a loss, move is a winning or drawing move or None.
+        A draw needs a disproof of the win of both players.
+        Returns None if the deadline passes, or if a search ends without
+        proving or disproving the win it looks for, before the position
+        is solved.
+        """
+        self._deadline = deadline
+        self.nodes = 0
+        history_length = len(self.board.move_history)
+        to_play = self.board.current_player
+        try:
+            win = self._prove(to_play)
+            if win:
+                return 1, self._proven_move()
+            loss = self._prove(GoBoardUtil.opponent(to_play))
+            if loss:
+                return -1, None
+            if win is False and loss is False:
+                return 0, self._proven_move()
+            return None
+        except _Timeout:
+            while len(self.board.move_history) > history_length:
+                self.board.pop_move()
+            return None
+
+    def _prove(self, attacker):
+        """
+        Run df-pn from the current position.
+        Returns True if attacker can force a win, False if it can not,
+        None if the root is neither proven nor disproven, which happens
+        when the table drops the positions it needs.
+        """
+        self._attacker = attacker
+        self._table = {}
+        self._mid(INFINITY - 1, INFINITY - 1)
+        phi, delta = self._lookup(self.board.hash())
+        if self.board.current_player != attacker:
+            phi, delta = delta, phi
+        if phi == 0:
+            return True
+        if delta == 0:
+            return False
+        return None
+
+    def _proven_move(self):
+        """ A move of the root to a child that the last search disproved """
+        board = self.board
+        for move in board.ordered_moves_gomoku():
+            if self._lookup(board.child_hash(move))[1] == 0:
+                return move
+        return None
+
+    def _lookup(self, key):
+        return self._table.get(key, (1, 1))
+
+    def _store(self, key, phi, delta):
+        if len(self._table) >= self.max_entries:
+            self._table = {k: v for k, v in self._table.items()
+                           if 0 in v}
+        self._table[key] = (phi, delta)
+
+    def _terminal(self):
+        """
+        (phi, delta) of the current position if the game is over, else None.
+        The player to move has lost if there is a winner. A full board is
+        a draw, which is a loss for the attacker and a win for the defender.
+        """
+        if self.board.check_game_end_gomoku()[0]:
+            return INFINITY, 0
+        if len(self.board.get_empty_points()) == 0:
+            if self.board.current_player == self._attacker:
+                return INFINITY, 0
+            return 0, INFINITY
+        return None
+
+    def _mid(self, phi_threshold, delta_threshold):
+        """
+        Search the current position until its phi reaches phi_threshold
+        or its delta reaches delta_threshold.
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.time() > self._deadline:
+            raise _Timeout()
+        board = self.board
+        key = board.hash()
+        terminal = self._terminal()
+        if terminal is not None:
+            self._store(key, *terminal)
+            return
+        moves = board.ordered_moves_gomoku()
+        while True:
+            phi, delta = INFINITY, 0
+            best_move, best_phi, best_delta = None, 0, INFINITY
+            second_delta = INFINITY
+            for move in moves:
+                child_phi, child_delta = self._lookup(board.child_hash(move))
+                delta = min(delta + child_phi, INFINITY)
+                if child_delta < best_delta:
+                    second_delta = best_delta
+                    best_move, best_phi, best_delta = \
+                        move, child_phi, child_delta
+                elif child_delta < second_delta:
+                    second_delta = child_delta
+            phi = best_delta
+            if phi >= phi_threshold or delta >= delta_threshold:
+                self._store(key, phi, delta)
+                return
+            self._store(key, phi, delta)
+            board.push_move(best_move, board.current_player)
+            self._mid(delta_threshold - delta + best_phi,
+                      min(phi_threshold, second_delta + 1))
+            board.pop_move()
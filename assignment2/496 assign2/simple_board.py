@@ -12,7 +12,61 @@ The board uses a 1-dimensional representation with padding
 import numpy as np
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
-                       MAXSIZE, NULLPOINT
+                       MAXSIZE, NULLPOINT, zobrist_keys
+
+"""
+Zobrist hash keys of each board size, shared by all boards of that size.
+"""
+_zobrist_of_size = {}
+
+"""
+Points of all lines of each board size, used by pattern_move_sets.
+"""
+_lines_of_size = {}
+
+"""
+Gomoku patterns used to order the moves of the alpha-beta search.
+They are seen from the player to move: x is a stone of that player,
+o a stone of the opponent, . an empty point and B the edge of the board.
+Each pattern maps to the offsets, from the start of the pattern,
+of the points to play on. The categories are ordered by urgency.
+"""
+WIN = 0
+BLOCK_WIN = 1
+OPEN_FOUR = 2
+BLOCK_OPEN_FOUR = 3
+PATTERNS = [
+    {'xxxx.':(4,), 'xxx.x':(3,), 'xx.xx':(2,), 'x.xxx':(1,), '.xxxx':(0,)}, #win
+    {'oooo.':(4,), 'ooo.o':(3,), 'oo.oo':(2,), 'o.ooo':(1,), '.oooo':(0,)}, #block win
+    {'.xxx..':(4,), '..xxx.':(1,), '.xx.x.':(3,), '.x.xx.':(2,)}, #make open four
+    {'.ooo..':(0,4), '..ooo.':(1,5), '.oo.o.':(0,3,5), '.o.oo.':(0,2,5),
+     'B.ooo..':(6,), 'x.ooo..':(6,), '..ooo.B':(0,), '..ooo.x':(0,)}, #block open four
+    {'Bxxx..':(4,5), 'oxxx..':(4,5), '..xxxB':(0,1), '..xxxo':(0,1),
+     'Bxx.x.':(3,5), 'oxx.x.':(3,5), '.xx.xB':(0,3), '.xx.xo':(0,3),
+     'Bx.xx.':(2,5), 'ox.xx.':(2,5), '.x.xxB':(0,2), '.x.xxo':(0,2)}, #make dead four
+    {'..xx...':(4,), '...xx..':(2,), '..x.x..':(3,)}, #make open three
+    {'o.xx...':(4,), 'B.xx...':(4,), '...xx.o':(2,), '...xx.B':(2,),
+     'o.x.x..':(3,), 'B.x.x..':(3,), '..x.x.o':(3,), '..x.x.B':(3,)}, #make low open three
+    {'..oo.':(1,4), '.oo..':(0,3), '.o.o.':(0,2,4)}, #block open three
+    {'.x...':(2,3), '..x..':(1,3), '...x.':(1,2)}, #make open two
+    {'oxx...':(3,4), 'Bxx...':(3,4), '...xxo':(1,2), '...xxB':(1,2),
+     'o.xx..o':(4,), 'o..xx.o':(2,), 'o.x.x.o':(3,)}, #make dead three
+    {'ox....':(2,), 'Bx....':(2,), '....xo':(3,), '....xB':(3,)}, #make dead two
+    {'xxx..':(3,4), 'xx.x.':(2,4), 'xx..x':(2,3), 'x.xx.':(1,4), 'x.x.x':(1,3),
+     'x..xx':(1,2), '.xxx.':(0,4), '.xx.x':(0,3), '.x.xx':(0,2), '..xxx':(0,1)} #make any four
+    ]
+MAKE_FOUR = 11
+# the fours are already scored by the open and dead four categories
+PATTERN_SCORES = [1000000, 900000, 500000, 200000, 90000, 40000, 25000,
+                  10000, 4500, 2000, 500, 0]
+_encoded_patterns = [[(pattern.encode(), offsets)
+                      for pattern, offsets in category.items()]
+                     for category in PATTERNS]
+# board colors to pattern characters, for each player to move
+_pattern_chars = {BLACK: bytes.maketrans(bytes([EMPTY, BLACK, WHITE, BORDER]),
+                                         b'.xoB'),
+                  WHITE: bytes.maketrans(bytes([EMPTY, BLACK, WHITE, BORDER]),
+                                         b'.oxB')}
 
 class SimpleGoBoard(object):
 
@@ -81,11 +135,21 @@ class SimpleGoBoard(object):
         self.WE = 1
         self.ko_recapture = None
         self.current_player = BLACK
+        self.winner = None
+        self._winning_point = None
+        self.move_history = []
         self.maxpoint = size * size + 3 * (size + 1)
         self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
         self._initialize_empty_points(self.board)
         self._initialize_neighbors()
+        if size not in _zobrist_of_size:
+            _zobrist_of_size[size] = zobrist_keys(self.maxpoint)
+        self._zobrist, self._white_to_play_key = _zobrist_of_size[size]
+        if size not in _lines_of_size:
+            _lines_of_size[size] = self._initialize_lines()
+        self._line_points = _lines_of_size[size]
+        self._stone_hash = 0
 
     def copy(self):
         b = SimpleGoBoard(self.size)
@@ -93,6 +157,10 @@ class SimpleGoBoard(object):
         assert b.WE == self.WE
         b.ko_recapture = self.ko_recapture
         b.current_player = self.current_player
+        b.winner = self.winner
+        b._winning_point = self._winning_point
+        b.move_history = list(self.move_history)
+        b._stone_hash = self._stone_hash
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
         return b
@@ -113,6 +181,26 @@ class SimpleGoBoard(object):
             start = self.row_start(row)
             board[start : start + self.size] = EMPTY
 
+    def _initialize_lines(self):
+        """
+        All horizontal, vertical and diagonal lines of the empty board,
+        each with the BORDER point before and after it, concatenated
+        into one array of points.
+        """
+        points = []
+        for shift in [1, self.NS, self.NS + 1, self.NS - 1]:
+            for start in where1d(self.board == EMPTY):
+                if self.board[start - shift] != BORDER:
+                    continue
+                p = start - shift
+                points.append(p)
+                p += shift
+                while 0 <= p < self.maxpoint and self.board[p] != BORDER:
+                    points.append(p)
+                    p += shift
+                points.append(p)
+        return np.array(points, dtype = np.int32)
+
     def _on_board_neighbors(self, point):
         nbs = []
         for nb in self._neighbors(point):
@@ -241,6 +329,9 @@ class SimpleGoBoard(object):
         if self._has_liberty(opp_block):
             return None
         captures = list(where1d(opp_block))
+        opp_keys = self._zobrist[self.board[nb_point]]
+        for stone in captures:
+            self._stone_hash ^= opp_keys[stone]
         self.board[captures] = EMPTY
         self.liberty_of[captures] = NULLPOINT
         single_capture = None 
@@ -268,6 +359,7 @@ class SimpleGoBoard(object):
         opp_color = GoBoardUtil.opponent(color)
         in_enemy_eye = self._is_surrounded(point, opp_color)
         self.board[point] = color
+        self._stone_hash ^= self._zobrist[color][point]
         single_captures = []
         neighbors = self.neighbors[point]
         for nb in neighbors:
@@ -280,6 +372,7 @@ class SimpleGoBoard(object):
             block = self._block_of(point)
             if not self._has_liberty(block): # undo suicide move
                 self.board[point] = EMPTY
+                self._stone_hash ^= self._zobrist[color][point]
                 return False
         self.ko_recapture = None
         if in_enemy_eye and len(single_captures) == 1:
@@ -347,12 +440,70 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self._stone_hash ^= self._zobrist[color][point]
         self.current_player = GoBoardUtil.opponent(color)
+        # only the four lines through the new stone can complete a five
+        if self.winner is None and self.point_check_game_end_gomoku(point):
+            self.winner = color
+            self._winning_point = point
         return True
         
+    def hash(self):
+        """
+        64-bit Zobrist hash of the position, including the player to move.
+        The stones are hashed incrementally as they are played and taken back.
+        """
+        if self.current_player == WHITE:
+            return self._stone_hash ^ self._white_to_play_key
+        return self._stone_hash
+
+    def child_hash(self, point):
+        """
+        The hash the position would have after the player to move
+        plays on point, without playing the move.
+        """
+        return self.hash() ^ self._zobrist[self.current_player][point] \
+                           ^ self._white_to_play_key
+
     def undo(self, move):
-        self.board[move] = 0
-        #self.current_player = GoBoardUtil.opponent(self.current_player)
+        """
+            Take back the stone on move, for the game of gomoku.
+            The stone's owner becomes the player to move again.
+            """
+        color = self.board[move]
+        assert is_black_white(color)
+        self.board[move] = EMPTY
+        self._stone_hash ^= self._zobrist[color][move]
+        self.current_player = color
+        if move == self._winning_point:
+            self.winner = None
+            self._winning_point = None
+
+    def push_move(self, point, color):
+        """
+            Play a gomoku move or a pass of color and remember it,
+            so it can be taken back by pop_move.
+            Returns boolean: whether move was legal
+            """
+        previous_player = self.current_player
+        if point == PASS:
+            self.current_player = GoBoardUtil.opponent(color)
+        elif not self.play_move_gomoku(point, color):
+            return False
+        self.move_history.append((point, previous_player))
+        return True
+
+    def pop_move(self):
+        """
+            Take back the last move played by push_move and
+            restore the state from before that move.
+            Returns the move.
+            """
+        point, previous_player = self.move_history.pop()
+        if point != PASS:
+            self.undo(point)
+        self.current_player = previous_player
+        return point
     
     def _point_direction_check_connect_gomoko(self, point, shift):
         """
@@ -371,6 +522,8 @@ class SimpleGoBoard(object):
                     break
             else:
                 break
+        if count == 5:
+            return True
         d = -d
         p = point
         while True:
@@ -409,16 +562,59 @@ class SimpleGoBoard(object):
     def check_game_end_gomoku(self):
         """
             Check if the game ends for the game of Gomoku.
+            The winner is tracked by play_move_gomoku and undo,
+            so this does not need to scan the board.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-    
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
+        if self.winner is not None:
+            return True, self.winner
         return False, None
+
+    def pattern_move_sets(self, color):
+        """
+            Find the points where color can play a move of each of the
+            categories in PATTERNS.
+            Returns a list with, for each category, the list of points
+            of all matches. A point is listed once for every match.
+            """
+        lines = self.board[self._line_points].astype(np.uint8).tobytes()
+        lines = lines.translate(_pattern_chars[color])
+        move_sets = []
+        for category in _encoded_patterns:
+            moves = []
+            for pattern, offsets in category:
+                i = lines.find(pattern)
+                while i >= 0:
+                    for offset in offsets:
+                        moves.append(self._line_points[i + offset])
+                    i = lines.find(pattern, i + 1)
+            move_sets.append(moves)
+        return move_sets
+
+    def ordered_moves_gomoku(self):
+        """
+            The legal moves of the player to move for gomoku, the most
+            urgent ones by the categories of pattern_move_sets first.
+            If the player can win, or must block a win of the opponent,
+            only those moves are returned. If the opponent threatens to
+            make an open four, only the moves that stop it and the moves
+            that make a four, which the opponent has to answer, are returned.
+            """
+        move_sets = self.pattern_move_sets(self.current_player)
+        for forced in [WIN, BLOCK_WIN]:
+            if move_sets[forced]:
+                return sorted(set(int(move) for move in move_sets[forced]))
+        candidates = None
+        if move_sets[BLOCK_OPEN_FOUR]:
+            candidates = set(int(move) for move in
+                             move_sets[BLOCK_OPEN_FOUR] + move_sets[MAKE_FOUR])
+        score = {}
+        for category, moves in enumerate(move_sets):
+            for move in moves:
+                move = int(move)
+                score[move] = score.get(move, 0) + PATTERN_SCORES[category]
+        if candidates is None:
+            moves = [int(move) for move in self.get_empty_points()]
+        else:
+            moves = sorted(candidates)
+        moves.sort(key = lambda move: score.get(move, 0), reverse = True)
+        return moves
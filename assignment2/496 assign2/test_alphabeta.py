@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import io
+import time
+from unittest import mock
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from gtp_connection import GtpConnection
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER
+from Gomoku import Gomoku
+from time_manager import FORCED, CRITICAL
+
+class TranspositionTableTestCase(unittest.TestCase):
+    """Tests for transposition_table.py"""
+
+    def test_size_rounded_to_power_of_two(self):
+        self.assertEqual(TranspositionTable(100).size, 128)
+
+    def test_store_and_lookup(self):
+        tt = TranspositionTable(16)
+        self.assertEqual(tt.lookup(5), None)
+        tt.store(5, 1, EXACT, 3, 42)
+        self.assertEqual(tt.lookup(5), (5, 1, EXACT, 3, 42))
+        self.assertEqual(tt.lookup(5 + 16), None)
+
+    def test_depth_preferred_and_always_replace(self):
+        tt = TranspositionTable(16)
+        tt.store(1, 0, LOWER, 6, 10)
+        tt.store(17, 0, UPPER, 2, 11)
+        tt.store(33, 0, UPPER, 1, 12)
+        # the deep entry survives, the shallow slot keeps the latest one
+        self.assertEqual(tt.lookup(1)[3], 6)
+        self.assertEqual(tt.lookup(17), None)
+        self.assertEqual(tt.lookup(33)[3], 1)
+        # a deeper entry moves the old deep entry to the other slot
+        tt.store(49, 0, EXACT, 7, 13)
+        self.assertEqual(tt.lookup(49)[3], 7)
+        self.assertEqual(tt.lookup(1)[3], 6)
+
+
+class MoveOrderingTestCase(unittest.TestCase):
+    """Tests for the pattern move ordering in simple_board.py"""
+
+    def board(self, moves):
+        board = SimpleGoBoard(7)
+        color = BLACK
+        for row, col in moves:
+            board.play_move_gomoku(board.pt(row, col), color)
+            color = WHITE + BLACK - color
+        return board
+
+    def test_only_winning_moves(self):
+        board = self.board([(4, 2), (3, 2), (4, 3), (3, 3),
+                            (4, 4), (3, 4), (4, 5), (3, 5)])
+        self.assertEqual(board.ordered_moves_gomoku(),
+                         [board.pt(4, 1), board.pt(4, 6)])
+
+    def test_only_blocking_moves(self):
+        board = self.board([(1, 1), (4, 2), (7, 7), (4, 3),
+                            (1, 7), (4, 4), (7, 1), (4, 5)])
+        self.assertEqual(board.ordered_moves_gomoku(),
+                         [board.pt(4, 1), board.pt(4, 6)])
+
+    def test_open_four_first(self):
+        board = self.board([(4, 3), (1, 1), (4, 4), (7, 7), (4, 5), (1, 7)])
+        moves = board.ordered_moves_gomoku()
+        self.assertIn(moves[0], [board.pt(4, 2), board.pt(4, 6)])
+        self.assertEqual(sorted(moves),
+                         sorted(int(p) for p in board.get_empty_points()))
+
+    def test_answers_to_open_three(self):
+        board = self.board([(4, 3), (1, 1), (4, 4), (1, 2), (4, 5), (1, 3),
+                            (7, 7)])
+        # block the three, or make a four on row 1
+        self.assertEqual(sorted(board.ordered_moves_gomoku()),
+                         sorted([board.pt(4, 2), board.pt(4, 6),
+                                 board.pt(1, 4), board.pt(1, 5)]))
+
+    def test_patterns_do_not_cross_the_edge(self):
+        board = self.board([(1, 4), (3, 3), (1, 5), (3, 4),
+                            (1, 6), (3, 5), (1, 7)])
+        # white's three is open, black's four on row 1 ends at the edge
+        self.assertEqual(board.ordered_moves_gomoku(), [board.pt(1, 3)])
+
+
+class AlphabetaTestCase(unittest.TestCase):
+    """Tests for the alpha-beta solver in gtp_connection.py"""
+
+    def connection(self, moves):
+        board = SimpleGoBoard(7)
+        color = BLACK
+        for row, col in moves:
+            board.play_move_gomoku(board.pt(row, col), color)
+            color = WHITE + BLACK - color
+        return GtpConnection(Gomoku(), board)
+
+    def test_finds_immediate_win(self):
+        con = self.connection([(4, 2), (3, 2), (4, 3), (3, 3),
+                               (4, 4), (3, 4), (4, 5), (3, 5)])
+        value, moves = con.callAlphabetaDL(2)
+        self.assertEqual(value, 1)
+        self.assertIn(moves[0], [con.board.pt(4, 1), con.board.pt(4, 6)])
+
+    def test_search_restores_board(self):
+        con = self.connection([(4, 4), (4, 5), (3, 3)])
+        before = list(con.board.board)
+        hash_before = con.board.hash()
+        con.callAlphabetaDL(3)
+        self.assertEqual(list(con.board.board), before)
+        self.assertEqual(con.board.hash(), hash_before)
+        self.assertEqual(con.board.current_player, WHITE)
+
+    def test_urgency(self):
+        con = self.connection([(4, 4)])
+        self.assertEqual(con.urgency(WHITE), 1.0)
+        con = self.connection([(4, 2), (1, 1), (4, 3), (1, 3), (4, 4)])
+        self.assertEqual(con.urgency(WHITE), CRITICAL)
+        self.assertEqual(con.urgency(BLACK), FORCED)
+        con = self.connection([(4, 2), (1, 1), (4, 3), (1, 3), (4, 4), (1, 5),
+                               (4, 5)])
+        self.assertEqual(con.urgency(WHITE), FORCED)
+
+    def test_genmove_on_the_game_clock(self):
+        con = self.connection([(4, 1), (1, 1), (4, 2), (1, 3), (4, 3), (1, 5),
+                               (4, 4)])
+        con.time_manager.time_settings(20, 0, 0)
+        with mock.patch('gtp_connection.stdout', io.StringIO()) as out:
+            con.get_cmd("genmove w")
+        self.assertEqual(out.getvalue(), "= E4\n\n")
+        self.assertLess(con.time_manager.left[WHITE], 20)
+        self.assertGreater(con.time_manager.left[WHITE], 19)
+        self.assertEqual(con.time_manager.left[BLACK], 20)
+
+    def test_timelimit_usage(self):
+        con = self.connection([])
+        for command in ["timelimit 0", "timelimit 101", "timelimit soon"]:
+            with mock.patch('gtp_connection.stdout', io.StringIO()) as out:
+                con.get_cmd(command)
+            self.assertEqual(out.getvalue(), "? Usage: timelimit INT\n\n")
+        with mock.patch('gtp_connection.stdout', io.StringIO()) as out:
+            con.get_cmd("timelimit 5")
+        self.assertEqual(out.getvalue(), "= \n\n")
+        self.assertEqual(con.time, 5)
+        self.assertEqual(con.time_manager.move_time, 5)
+
+    def test_tt_size_usage(self):
+        con = self.connection([])
+        for command in ["tt_size 0", "tt_size many"]:
+            with mock.patch('gtp_connection.stdout', io.StringIO()) as out:
+                con.get_cmd(command)
+            self.assertEqual(out.getvalue(), "? Usage: tt_size INT\n\n")
+        table = con.tt
+        with mock.patch('gtp_connection.stdout', io.StringIO()) as out:
+            con.get_cmd("tt_size 64")
+        self.assertEqual(out.getvalue(), "= \n\n")
+        self.assertIsNot(con.tt, table)
+
+    def test_same_value_with_and_without_table(self):
+        moves = [(4, 4), (4, 5), (3, 3), (5, 5), (2, 2)]
+        with_table = self.connection(moves)
+        first = with_table.callAlphabetaDL(3)[0]
+        # a second search reuses the stored positions
+        self.assertEqual(with_table.callAlphabetaDL(3)[0], first)
+        self.assertEqual(self.connection(moves).callAlphabetaDL(3)[0], first)
+
+    def test_iterative_deepening_proves_win(self):
+        con = self.connection([(4, 2), (3, 2), (4, 3), (3, 3),
+                               (4, 4), (3, 4), (4, 5), (3, 5)])
+        value, moves, proven, depth = con.iterative_deepening(time.time() + 10)
+        self.assertEqual((value, proven, depth), (1, True, 1))
+        self.assertIn(moves[0], [con.board.pt(4, 1), con.board.pt(4, 6)])
+
+    def test_iterative_deepening_stops_at_deadline(self):
+        con = self.connection([(4, 4)])
+        hash_before = con.board.hash()
+        start = time.time()
+        result = con.iterative_deepening(start + 0.5)
+        self.assertLess(time.time() - start, 1.5)
+        value, moves, proven, depth = result
+        self.assertFalse(proven)
+        self.assertGreaterEqual(depth, 1)
+        self.assertEqual(con.board.move_history, [])
+        self.assertEqual(con.board.hash(), hash_before)
+        self.assertEqual(con.board.current_player, WHITE)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import time
+from unittest import mock
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from pn_search import ProofNumberSearch
+
+class ProofNumberSearchTestCase(unittest.TestCase):
+    """Tests for pn_search.py"""
+
+    def board(self, moves, size = 7):
+        board = SimpleGoBoard(size)
+        color = BLACK
+        for row, col in moves:
+            board.play_move_gomoku(board.pt(row, col), color)
+            color = WHITE + BLACK - color
+        return board
+
+    def test_win(self):
+        board = self.board([(4, 2), (3, 2), (4, 3), (3, 3),
+                            (4, 4), (3, 4), (4, 5), (3, 5)])
+        value, move = ProofNumberSearch(board).solve(time.time() + 10)
+        self.assertEqual(value, 1)
+        self.assertIn(move, [board.pt(4, 1), board.pt(4, 6)])
+
+    def test_loss(self):
+        # black has an open four, white can only block one end
+        board = self.board([(4, 2), (1, 1), (4, 3), (1, 7), (4, 4), (7, 1),
+                            (4, 5)])
+        self.assertEqual(ProofNumberSearch(board).solve(time.time() + 10),
+                         (-1, None))
+
+    def test_draw(self):
+        # there is no room for five in a row on a 4x4 board
+        board = self.board([(1, 1), (1, 2), (2, 2), (2, 1), (3, 3), (3, 4),
+                            (4, 4), (4, 3), (1, 3), (1, 4)], size = 4)
+        value, move = ProofNumberSearch(board).solve(time.time() + 10)
+        self.assertEqual(value, 0)
+        self.assertIn(move, list(board.get_empty_points()))
+
+    def test_unresolved_root_is_not_a_draw(self):
+        board = self.board([(4, 4)])
+        search = ProofNumberSearch(board)
+        # a search that leaves the root neither proven nor disproven
+        with mock.patch.object(search, '_mid'):
+            self.assertEqual(search.solve(time.time() + 10), None)
+
+    def test_timeout_restores_board(self):
+        board = self.board([(4, 4)])
+        hash_before = board.hash()
+        search = ProofNumberSearch(board)
+        self.assertEqual(search.solve(time.time() + 0.2), None)
+        self.assertGreater(search.nodes, 0)
+        self.assertEqual(board.move_history, [])
+        self.assertEqual(board.hash(), hash_before)
+        self.assertEqual(board.current_player, WHITE)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
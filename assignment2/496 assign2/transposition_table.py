@@ -0,0 +1,69 @@
+"""
+transposition_table.py
+
+A bounded transposition table for the alpha-beta search, keyed on the
+64-bit Zobrist hash of a position (SimpleGoBoard.hash).
+
+The table is an array of buckets with two slots each:
+- a depth-preferred slot, which keeps the entry that was searched deepest
+- an always-replace slot, which takes every other new entry
+so deep results survive while recent shallow ones are still available.
+"""
+
+"""
+Bound type of a stored value
+"""
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class TranspositionTable(object):
+
+    def __init__(self, size = 2 ** 16):
+        """
+        size is the number of buckets, rounded up to a power of two.
+        The table holds at most 2 * size positions.
+        """
+        assert size >= 1
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self.clear()
+
+    def clear(self):
+        self._mask = self.size - 1
+        self._deep = [None] * self.size
+        self._recent = [None] * self.size
+        self.hits = 0
+        self.stores = 0
+
+    def lookup(self, key):
+        """
+        Return the entry (key, value, bound, depth, move) stored for key,
+        or None.
+        """
+        index = key & self._mask
+        entry = self._deep[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        entry = self._recent[index]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, value, bound, depth, move):
+        """
+        Store the result of searching position key to the given depth.
+        """
+        index = key & self._mask
+        entry = (key, value, bound, depth, move)
+        self.stores += 1
+        deep = self._deep[index]
+        if deep is None or deep[0] == key or depth >= deep[3]:
+            if deep is not None and deep[0] != key:
+                self._recent[index] = deep
+            self._deep[index] = entry
+        else:
+            self._recent[index] = entry
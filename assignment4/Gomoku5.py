@@ -4,118 +4,109 @@
 
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
-from simple_board import SimpleGoBoard
+from simple_board import SimpleGoBoard, RANDOM
+from bit_board import BitGoBoard
 from board_util import GoBoardUtil
 #from pattern_util import PatternUtil
 import numpy as np
 import argparse
+import multiprocessing
 import sys
 from GomokuMCTS import MCTS
+from time_manager import FORCED, CRITICAL
 
-def count_at_depth(node, depth, nodesAtDepth):
-    if not node._expanded:
-        return
-    nodesAtDepth[depth] += 1
-    for _,child in node._children.items():
-        count_at_depth(child, depth+1, nodesAtDepth)
-
-    
 def policy_value_fn(actived_features):
     
     return 100000*actived_features[0]+10000*actived_features[1]+5000*actived_features[2]+1000*actived_features[3]+500*actived_features[4]+400*actived_features[5]+100*actived_features[6]+90*actived_features[7]+50*actived_features[8]+10*actived_features[9]+9*actived_features[10]+5*actived_features[11]+2*actived_features[11]+1
 
 def feature1(board,move,color):
-    board_copy = board.copy()
-    board_copy.play_move_gomoku(move, color)
-    
+    board.push_move(move, color)
+
+    board.pop_move()
 
     actived = 1
     return actived    # 0 or 1
 
 def feature2(board,move,color):
-    board_copy = board.copy()
-    board_copy.play_move_gomoku(move, color)
-    
+    board.push_move(move, color)
+
+    board.pop_move()
 
     actived = 1
     return actived    # 0 or 1
 
 def feature3(board,move,color):
-    board_copy = board.copy()
-    board_copy.play_move_gomoku(move, color)
-    
+    board.push_move(move, color)
+
+    board.pop_move()
 
     actived = 1
     return actived    # 0 or 1
 
 def feature4(board,move,color):
-    board_copy = board.copy()
-    board_copy.play_move_gomoku(move, color)
-    
+    board.push_move(move, color)
+
+    board.pop_move()
 
     actived = 1
     return actived    # 0 or 1
 
 def feature5(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
 def feature6(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
 def feature7(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
 def feature8(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
 def feature9(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
 def feature10(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
 def feature11(board,move,color):
-    board.play_move_gomoku(move, color)
+    board.push_move(move, color)
 
 
-    undo(board,move)
+    board.pop_move()
     actived = 1
     return actived    # 0 or 1
 
-def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
-
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
 
@@ -130,11 +121,14 @@ def game_result(board):
         return 'draw'
     return None
 
+# making an open four is a forced move too, see forced_moves
+_urgency_of_threat = {'Win': FORCED, 'BlockWin': FORCED,
+                      'OpenFour': FORCED, 'BlockOpenFour': CRITICAL}
+
 class Gomoku5():
 
-    def __init__(self,num_sim, use_pattern, sim_rule,in_tree_knowledge,size=7,limit=100,exploration=0.4):
+    def __init__(self,num_sim, use_pattern, sim_rule,in_tree_knowledge,size=7,limit=100,exploration=0.4,batch_size=1,threads=1,rave=False,early_stop=0,confidence=None,ponder=False,processes=1):
         self.name = "Gomoku5"
-        self.best_move = None
         self.version = 0.22
         self.MCTS = MCTS()
         self.limit = limit
@@ -143,17 +137,114 @@ class Gomoku5():
         self.exploration = exploration
         self.sim_rule = sim_rule
         self.in_tree_knowledge = in_tree_knowledge
+        self.batch_size = batch_size
+        self.threads = threads
+        self.processes = processes
+        self.rave = rave
+        self.early_stop = early_stop
+        self.confidence = confidence
+        self.pondering = ponder
+        self._forced = False
+        self.workers = 1
+        self._pool = None
 
     def reset(self):
         self.MCTS=MCTS()
+
+    def set_workers(self, workers):
+        """
+        Search with that many worker processes, see MCTS.get_move.
+        The pool is started by the next get_move that needs it.
+        """
+        assert workers >= 1
+        if workers != self.workers:
+            self.shutdown()
+        self.workers = workers
+
+    def shutdown(self):
+        """ Stop the worker processes, if any """
+        self.stop_pondering()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def set_playout_policy(self, playout_policy):
+        assert playout_policy in ('random', 'rule_based')
+        self.sim_rule = playout_policy
+
+    def policy_moves(self, board, color):
+        """
+        The move type and the moves the playout policy chooses from
+        for color, see rollout_move.
+        """
+        if self.sim_rule == 'random':
+            return RANDOM, board.get_empty_points().tolist()
+        return board.threat_moves(color)
     
-    def update(self,move):
-        self.parent = self.MCTS._root
-        self.MCTS.update_with_move(move)
+    def ponder(self, board, color):
+        """
+        With pondering on, search on the opponent's time: from board,
+        with color to play, until the next command, see
+        MCTS.start_pondering.
+        """
+        if not self.pondering or board.check_game_end_gomoku()[0] or \
+                len(board.get_empty_points()) == 0:
+            return
+        self.MCTS.start_pondering(board, color, self.batch_size, self.threads,
+                                  exploration = self.exploration,
+                                  simulation_policy = self.sim_rule,
+                                  rave = self.rave)
+
+    def stop_pondering(self):
+        self.MCTS.stop_pondering()
+
+    def urgency(self, board, color):
+        """
+        How much search time the move of color deserves, relative to
+        the others, from the threats on board, see time_manager.py.
+        """
+        category, _ = board.threat_moves(color)
+        return _urgency_of_threat.get(category, 1.0)
+
+    def root_value(self):
+        """
+        The win rate of the best move of the last search,
+        None if the last move was forced.
+        """
+        if self._forced:
+            return None
+        return self.MCTS.root_value()
+
+    def update(self, board, move, color):
+        """
+        Follow the move of color just played on board, by either player,
+        so the search tree under it is kept for the next get_move.
+        """
+        self.MCTS.update_with_move(move, color, board)
     
-    def get_move(self, board, toplay):
-        best_move = self.MCTS.get_move(board,toplay,limit=self.limit, use_pattern = self.use_pattern,num_simulation = self.num_simulation,exploration = self.exploration,simulation_policy = self.sim_rule)# in_tree_knowledge = self.in_tree_knowledge)
-        self.update(best_move)
+    @property
+    def best_move(self):
+        """ The best move found so far by the current or last search """
+        return self.MCTS.best_move
+
+    def get_move(self, board, toplay, deadline=None):
+        """
+        Search until the deadline, a time.time() value, if there is one,
+        otherwise for num_simulation playouts. Forced moves are returned
+        without a search.
+        """
+        # forced moves are played at once, the others are searched
+        # among the moves that do not lose at once, see forced_moves
+        self._forced = False
+        forced, root_moves = board.forced_moves(toplay)
+        if forced is not None:
+            self._forced = True
+            return forced
+        if self.workers > 1 and self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers)
+        num_simulation = None if deadline is not None else self.num_simulation
+        best_move = self.MCTS.get_move(board,toplay,limit=self.limit, use_pattern = self.use_pattern,num_simulation = num_simulation,deadline = deadline,exploration = self.exploration,simulation_policy = self.sim_rule,batch_size = self.batch_size,pool = self._pool,workers = self.workers,threads = self.threads,rave = self.rave,early_stop = self.early_stop,confidence = self.confidence,root_moves = root_moves,processes = self.processes)# in_tree_knowledge = self.in_tree_knowledge)
         return best_move
     #-----------------------------------------------------
     #in gtp_connection, we need to change gomoku5.get_move to features_get_move to active this function
@@ -183,25 +274,52 @@ class Gomoku5():
         return best_move
     #------------------------------------------------------
 
-    def get_node_depth(self,root):
+    def get_node_depth(self):
+        """ The number of expanded nodes at each depth of the search tree """
         MAX_DEPTH = 49
-        nodesAtDepth = [0]*MAX_DEPTH
-        count_at_depth(root, 0, nodesAtDepth)
-        return nodesAtDepth
+        return self.MCTS.tree.depth_counts(MAX_DEPTH)
     
     def get_properties(self):
         return dict(version = self.version, name = self.__class__.__name__)
 
-def run(num_sim, sim_rule, in_tree_knowledge):
+def run(num_sim, sim_rule, in_tree_knowledge, use_bitboard=False, batch_size=1, workers=1, threads=1, rave=False, early_stop=0, confidence=None, ponder=False, processes=1):
     #--------------------------
     use_pattern = None
     #--------------------------
-    board = SimpleGoBoard(7)
-    con = GtpConnection(Gomoku5(num_sim, use_pattern,sim_rule,in_tree_knowledge),board)
+    if use_bitboard:
+        board = BitGoBoard(7)
+    else:
+        board = SimpleGoBoard(7)
+    engine = Gomoku5(num_sim, use_pattern,sim_rule,in_tree_knowledge,batch_size=batch_size,threads=threads,rave=rave,early_stop=early_stop,confidence=confidence,ponder=ponder,processes=processes)
+    engine.set_workers(workers)
+    con = GtpConnection(engine,board)
     con.start_connection()
 
 if __name__ == '__main__':
-    num_sim = 20
+    parser = argparse.ArgumentParser(description='Gomoku5 MCTS player')
+    parser.add_argument('--bitboard', action='store_true',
+                        help='use the bitboard implementation of the board, '
+                             'faster with the random policy only')
+    parser.add_argument('--batch', type=int, default=1, metavar='N',
+                        help='play the rollouts N at a time with NumPy')
+    parser.add_argument('--workers', type=int, default=1, metavar='K',
+                        help='search K trees in parallel processes')
+    parser.add_argument('--threads', type=int, default=1, metavar='T',
+                        help='search each tree with T threads, they '
+                             'interleave the playouts on one core')
+    parser.add_argument('--processes', type=int, default=1, metavar='P',
+                        help='search one tree with P processes on P cores')
+    parser.add_argument('--rave', action='store_true',
+                        help='select moves with RAVE, using AMAF statistics')
+    parser.add_argument('--early-stop', type=int, default=0, metavar='N',
+                        help='every N playouts, stop if the move is settled')
+    parser.add_argument('--confidence', type=float, default=None, metavar='Z',
+                        help='with --early-stop, also stop when the best win '
+                             'rate is Z standard deviations above the others')
+    parser.add_argument('--ponder', action='store_true',
+                        help='search on the opponent\'s time')
+    args = parser.parse_args()
+    num_sim = 98*3
     sim_rule = None
     in_tree_knowledge = None
-    run(num_sim,sim_rule,in_tree_knowledge)
+    run(num_sim,sim_rule,in_tree_knowledge,args.bitboard,args.batch,args.workers,args.threads,args.rave,args.early_stop,args.confidence,args.ponder,args.processes)
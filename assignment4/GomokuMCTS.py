@@ -1,152 +1,397 @@
 #!/usr/bin/python3
 """
 This function is loosely based on https://github.com/Rochester-NRT/RocAlphaGo/blob/develop/AlphaGo/mcts.py
+The tree is stored in a NodeStore, see node_store.py.
 """
 import os, sys
+import ctypes
+import multiprocessing
 import numpy as np
 import random
+import threading
+import time
 from board_util import GoBoardUtil, BLACK, WHITE, PASS
 #from pattern_util import PatternUtil
 from gtp_connection import point_to_coord, format_point
+from batch_rollout import BatchRollout
+from node_store import NodeStore, SharedNodeStore, NO_NODE, PASS_MOVE
 
+ROOT = NodeStore.ROOT
 
-PASS = 'pass'
+"""
+sqrt(log(n)) for each parent visit count n, grown as needed by
+_sqrt_log. It is 0 for n = 0: the children of a node without visits
+are all unvisited, their UCT value does not use it.
+"""
+_sqrt_log_table = np.zeros(1)
 
-def uct_val(node, child, exploration, max_flag): 
-    if child._n_visits == 0:
-        return float("inf")
-    if max_flag:
-        return float(child._black_wins)/child._n_visits + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
-    else:
-        return float(child._n_visits - child._black_wins)/child._n_visits + exploration*np.sqrt(np.log(node._n_visits)/child._n_visits)
+def _sqrt_log(n):
+    global _sqrt_log_table
+    if n >= len(_sqrt_log_table):
+        size = max(2 * len(_sqrt_log_table), n + 1, 1024)
+        _sqrt_log_table = np.sqrt(np.log(np.maximum(np.arange(size), 1)))
+    return _sqrt_log_table[n]
 
-class TreeNode(object):
+def uct_values(parent_visits, visits, black_wins, exploration, max_flag):
     """
-    A node in the MCTS tree.
+    The UCT values of children with the given visits and black wins,
+    for all children at once. Unvisited children are masked to infinity,
+    the others get their win rate for the player to move plus
+    exploration * sqrt(log(parent_visits) / visits).
     """
-    version = 0.22
-    name = "MCTS Player"
-    def __init__(self, parent):
-        """
-        parent is set when a node gets expanded
-        """
-        self._parent = parent
-        self._children = {}  # a map from move to TreeNode
-        self._n_visits = 0
-        self._black_wins = 0
-        self._expanded = False
-        self._move = None
+    seen = np.maximum(visits, 1)
+    rate = black_wins / seen
+    if not max_flag:
+        rate = 1.0 - rate
+    values = rate + exploration * _sqrt_log(int(parent_visits)) / np.sqrt(seen)
+    values[visits == 0] = np.inf
+    return values
 
-    def expand(self, board, color):
-        """
-        Expands tree by creating new children.
-        """
-        moves = board.get_empty_points()
-        for move in moves:
-            if move not in self._children:
-                if board.is_legal(move, color): #and not board.is_eye(move, color):
-                    self._children[move] = TreeNode(self)
-                    self._children[move]._move = move
-        self._children[PASS] = TreeNode(self)
-        self._children[PASS]._move = PASS
-        self._expanded = True
+"""
+RAVE_EQUIVALENCE: the number of visits at which the win rate of a child
+and its AMAF win rate count the same in rave_values.
+UNVISITED: the value that puts unvisited children before all others.
+"""
+RAVE_EQUIVALENCE = 300
+UNVISITED = 1e9
 
-    def select(self, exploration, max_flag):
-        """
-        Select move among children that gives maximizes UCT. 
-        If number of visits are zero for a node, value for that node is infinite, so definitely will get selected
+def rave_values(parent_visits, visits, black_wins, amaf_visits,
+                amaf_black_wins, exploration, max_flag):
+    """
+    The values of uct_values with the win rate of each child mixed with
+    its AMAF win rate, (1 - beta) * rate + beta * amaf_rate, where
+    beta = sqrt(k / (3 * visits + k)) and k is RAVE_EQUIVALENCE.
+    Unvisited children still come first, in the order of their AMAF win
+    rate, 0.5 for the children without AMAF statistics.
+    """
+    seen = np.maximum(visits, 1)
+    rate = black_wins / seen
+    amaf_rate = np.where(amaf_visits > 0,
+                         amaf_black_wins / np.maximum(amaf_visits, 1), 0.5)
+    if not max_flag:
+        rate = 1.0 - rate
+        amaf_rate = 1.0 - amaf_rate
+    beta = np.sqrt(RAVE_EQUIVALENCE / (3.0 * visits + RAVE_EQUIVALENCE))
+    values = (1.0 - beta) * rate + beta * amaf_rate + \
+        exploration * _sqrt_log(int(parent_visits)) / np.sqrt(seen)
+    unvisited = visits == 0
+    values[unvisited] = UNVISITED + amaf_rate[unvisited]
+    return values
 
-        It uses: argmax(child_num_black_wins/child_num_vists + C * sqrt(2 * ln * Parent_num_vists/child_num_visits) )
-        Returns:
-        A tuple of (move, next_node)
-        """
-        return max(self._children.items(), key=lambda items:uct_val(self, items[1], exploration, max_flag))
-        
-    def update(self, leaf_value):
-        """
-        Update node values from leaf evaluation.
-        Arguments:
-        leaf_value -- the value of subtree evaluation from the current player's perspective.
-        
-        Returns:
-        None
-        """
-        self._black_wins += leaf_value
-        self._n_visits += 1
+"""
+The most playouts of one start_pondering, it bounds the size of the tree
+when the opponent thinks for a long time.
+"""
+PONDER_PLAYOUTS = 100000
 
-    def update_recursive(self, leaf_value):
-        """
-        Like a call to update(), but applied recursively for all ancestors.
+"""
+The most nodes of the shared tree of a tree parallel search in processes,
+see MCTS._search_processes. A node takes 48 bytes.
+"""
+SHARED_NODES = 2 ** 20
 
-        Note: it is important that this happens from the root downward so that 'parent' visit
-        counts are correct.
-        """
-        # If it is not root, this node's parent should be updated first.
-        if self._parent:
-            self._parent.update_recursive(leaf_value)
-        self.update(leaf_value)
+def root_key(board, toplay):
+    """
+    The key of the position of board with toplay to play,
+    from the Zobrist hash of its stones and its player to move.
+    """
+    return board.hash(), toplay
 
+def decision_settled(visits, black_wins, remaining, max_flag,
+                     confidence = None):
+    """
+    Whether more playouts can no longer change the move of the root,
+    given the visits and black wins of its children:
+    - the second most visited child is more than remaining visits behind
+      the most visited one, so it cannot overtake it, or
+    - with confidence, a number of standard deviations, the win rate of
+      the most visited child for the player to move is above the win
+      rates of all others by the confidence intervals of the rates,
+      confidence * 0.5 / sqrt(visits) wide. Unvisited children could
+      have any rate.
+    """
+    if len(visits) < 2:
+        return True
+    second, best = np.argsort(visits, kind = 'stable')[-2:]
+    if visits[best] - visits[second] > remaining:
+        return True
+    if confidence is None:
+        return False
+    seen = np.maximum(visits, 1)
+    rate = black_wins / seen
+    if not max_flag:
+        rate = 1.0 - rate
+    width = confidence * 0.5 / np.sqrt(seen)
+    upper = rate + width
+    upper[visits == 0] = np.inf
+    upper[best] = -np.inf
+    return rate[best] - width[best] > upper.max()
 
-    def is_leaf(self):
-        """
-        Check if leaf node (i.e. no nodes below this have been expanded).
-        """
-        return self._children == {}
+def rollout_move(board, simulation_policy):
+    """
+    The move of the simulation policy on board for the player to move,
+    None when the board is full.
+    random: a random empty point
+    rule_based: a random move of the most urgent threat, see threat_moves
+    otherwise: the best move of the pattern scores, see get_pattern_moves
+    """
+    if simulation_policy == "random":
+        moves = board.get_empty_points()
+    elif simulation_policy == "rule_based":
+        _, moves = board.threat_moves()
+    else:
+        return board.get_pattern_moves()[0][0]
+    if len(moves) == 0:
+        return None
+    return moves[random.randrange(len(moves))]
 
-    def is_root(self):
-        return self._parent is None
+def _root_search(args):
+    """
+    The task of a worker of root parallel search: search a new tree
+    from board with its own random seed, return the moves, visits and
+    black wins of the children of the root.
+    """
+    board, toplay, settings, seed = args
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    mcts = MCTS()
+    mcts.shuffle = True
+    mcts.toplay = toplay
+    mcts.limit = settings['limit']
+    mcts.use_pattern = settings['use_pattern']
+    mcts.exploration = settings['exploration']
+    mcts.simulation_policy = settings['simulation_policy']
+    mcts.rave = settings['rave']
+    mcts.early_stop = settings['early_stop']
+    mcts.confidence = settings['confidence']
+    mcts._restrict_root(settings['root_moves'])
+    mcts._search(board, toplay, settings['batch_size'], settings['threads'],
+                 settings['total'], settings['deadline'])
+    return mcts._root_stats()
+
+def _tree_search(tree, lock, counters, board, toplay, settings, seed):
+    """
+    The task of a process of tree parallel search, see
+    MCTS._search_processes: search tree, a SharedNodeStore, together with
+    the other processes, holding lock to change it, and taking the
+    playouts from counters.
+    """
+    random.seed(seed)
+    np.random.seed(seed % 2**32)
+    mcts = MCTS()
+    mcts.tree = tree
+    mcts._lock = lock
+    mcts.toplay = toplay
+    mcts.exploration = settings['exploration']
+    mcts.simulation_policy = settings['simulation_policy']
+    mcts.rave = settings['rave']
+    mcts.early_stop = settings['early_stop']
+    mcts.confidence = settings['confidence']
+    mcts._root_allowed = settings['root_allowed']
+    mcts._search_threads(board, toplay, settings['batch_size'],
+                         settings['threads'], np.ctypeslib.as_array(counters),
+                         settings['start'], settings['deadline'], True)
 
+def merge_roots(stats):
+    """
+    A tree whose root children add up the statistics of the roots of
+    _root_search, see MCTS._root_stats. The children are not expanded.
+    """
+    moves = np.unique(np.concatenate([root_moves for root_moves, _, _ in stats]))
+    tree = NodeStore()
+    tree.expand(ROOT, moves)
+    children = tree.children(ROOT)
+    for root_moves, visits, black_wins in stats:
+        index = children.start + np.searchsorted(moves, root_moves)
+        tree.visits[index] += visits
+        tree.black_wins[index] += black_wins
+    tree.visits[ROOT] = tree.visits[children.start:children.stop].sum()
+    tree.black_wins[ROOT] = tree.black_wins[children.start:children.stop].sum()
+    return tree
 
 class MCTS(object):
+    version = 0.22
+    name = "MCTS Player"
+
     def __init__(self):
-        self._root = TreeNode(None)
+        self.tree = NodeStore()
         self.toplay = BLACK
+        # the position the root of the tree stands for, see root_key
+        self.root_key = None
+        # the most visited move of the root, kept up to date by _search
+        self.best_move = None
+        # the early stopping of _search, off by default
+        self.early_stop = 0
+        self.confidence = None
+        # the search settings, until get_move or start_pondering sets them
+        self.limit = 100
+        self.use_pattern = None
+        self.exploration = 0.4
+        self.simulation_policy = "rule_based"
+        self.shuffle = False
+        self.rave = False
+        self._batch_rollout = None
+        # guards the tree when several threads search it, see _search,
+        # a process lock in the processes of _search_processes
+        self._lock = threading.Lock()
+        # set to make _search stop, see stop_pondering
+        self._stop = threading.Event()
+        self._ponder_thread = None
+        # which children of the root the search may choose, None for all
+        self._root_allowed = None
+
+    def _expand(self, node, board):
+        """
+        Create a child of node for every legal gomoku move and for pass.
+        With shuffle, the children are created in a random order,
+        so the ties of _select_child are broken at random.
+        """
+        # every empty point is a legal gomoku move, see is_legal_gomoku
+        moves = board.get_empty_points()
+        # a shared tree that is full keeps its leaves, see SharedNodeStore
+        if not self.tree.has_room(len(moves) + 1):
+            return
+        if self.shuffle:
+            moves = np.random.permutation(moves)
+        self.tree.expand(node, np.append(moves, PASS_MOVE))
+
+    def _select_child(self, node, max_flag):
+        """
+        The child of node with the highest UCT value, the first one on ties.
+        With rave, the values mix in the AMAF statistics, see rave_values.
+        At the root, only the children allowed by _restrict_root.
+        """
+        tree = self.tree
+        first, last = tree.first_child[node], tree.first_child[node] + tree.child_count[node]
+        if self.rave:
+            values = rave_values(tree.visits[node], tree.visits[first:last],
+                                 tree.black_wins[first:last],
+                                 tree.amaf_visits[first:last],
+                                 tree.amaf_black_wins[first:last],
+                                 self.exploration, max_flag)
+        else:
+            values = uct_values(tree.visits[node], tree.visits[first:last],
+                                tree.black_wins[first:last],
+                                self.exploration, max_flag)
+        if node == ROOT and self._root_allowed is not None:
+            values[~self._root_allowed] = -np.inf
+        return int(first) + int(np.argmax(values))
+
     def _playout(self, board, color,n):
         """
         Run a single playout from the root to the given depth, getting a value at the leaf and
-        propagating it back through its parents. State is modified in-place, so a copy must be
-        provided.
+        propagating it back through its parents. The moves are played on board with push_move
+        and taken back before returning, so the same board can be used for every playout.
 
         Arguments:
-        board -- a copy of the board.
+        board -- the board, it is restored to its original state on return.
         color -- color to play
         
 
         Returns:
         None
         """
-        
-        node = self._root 
+        depth = len(board.move_history)
+        path, leaf_color = self._select_leaf(board, color)
+        leaf_value = self._evaluate_rollout(board, leaf_color,n)
+        if self.rave:
+            self.tree.update_amaf(path, color, board.board, leaf_value)
+        while len(board.move_history) > depth:
+            board.pop_move()
+        # Update value and visit count of nodes in this traversal.
+        self.tree.update(path, leaf_value)
+
+    def _select_leaf(self, board, color):
+        """
+        Follow the tree policy from the root to a leaf and expand it,
+        unless the game is over there.
+        The moves on the way are pushed on board, the caller pops them.
+
+        Returns:
+        the path of the nodes from the root to the leaf, and the color
+        to play at the leaf
+        """
+        tree = self.tree
+        node = ROOT
+        path = [node]
         # This will be True olny once for the root
-        if not node._expanded:
-            
-            node.expand(board, color)
+        if tree.is_leaf(node):
+            self._expand(node, board)
         
-        while not node.is_leaf():
+        while not tree.is_leaf(node):
             # Greedily select next move.                
             max_flag = color == BLACK
-            move, next_node = node.select(self.exploration,max_flag)
-            if move!=PASS:
-                assert board.is_legal(move, color)
-            if move == PASS:
+            node = self._select_child(node, max_flag)
+            path.append(node)
+            move = int(tree.move[node])
+            if move == PASS_MOVE:
                 move = None
-                board.current_player = GoBoardUtil.opponent(color)
             else:
-             
-                board.play_move_gomoku(move, color)
-               
+                assert board.is_legal_gomoku(move, color)
+            board.push_move(move, color)
             color = GoBoardUtil.opponent(color) 
-            node = next_node
-        assert node.is_leaf()
-        if not node._expanded:
-            node.expand(board, color)
+        # a finished game stays a leaf, its rollouts return the winner
+        if not board.check_game_end_gomoku()[0]:
+            self._expand(node, board)
 
         assert board.current_player == color
-     
-        leaf_value = self._evaluate_rollout(board, color,n)
-        print("I have done played out "+ "move is "+ str(move)+' leaf value is'+str(leaf_value),'this is my ',n,'simulation')
-        # Update value and visit count of nodes in this traversal.
-        node.update_recursive(leaf_value)
+        return path, color
+
+    def _playout_batch(self, board, color, count):
+        """
+        Run count playouts whose rollouts are played together by BatchRollout.
+        Each leaf is first backed up as half a win, a draw for both players,
+        so the next selections of the batch spread over the tree. The half
+        win is replaced by the rollout result once the batch is played.
+        """
+        if self._batch_rollout is None or self._batch_rollout.size != board.size:
+            self._batch_rollout = BatchRollout(board.size)
+        depth = len(board.move_history)
+        paths = []
+        boards = np.empty((count, board.maxpoint), dtype = np.int32)
+        to_play = np.empty(count, dtype = np.int64)
+        for i in range(count):
+            with self._lock:
+                path, leaf_color = self._select_leaf(board, color)
+                self.tree.update(path, 0.5)
+            boards[i] = board.board
+            to_play[i] = leaf_color
+            while len(board.move_history) > depth:
+                board.pop_move()
+            paths.append(path)
+        winners = self._batch_rollout.run(boards, to_play, self.simulation_policy)
+        with self._lock:
+            for path, final_board, winner in zip(paths, boards, winners):
+                leaf_value = float(winner == BLACK)
+                self.tree.update(path, leaf_value - 0.5, visits=0)
+                if self.rave:
+                    self.tree.update_amaf(path, color, final_board, leaf_value)
+
+    def _playout_shared(self, board, color):
+        """
+        A playout in a tree searched by several threads or processes. The
+        tree is only touched with the lock held, the rollout runs without it.
+        Every node on the way down gets a virtual loss, a visit lost by
+        the player who moved there, so the other threads prefer other
+        paths while the rollout runs. Backup replaces it by the result.
+        """
+        tree = self.tree
+        depth = len(board.move_history)
+        with self._lock:
+            path, leaf_color = self._select_leaf(board, color)
+            # the player who moved to the root is the opponent of color,
+            # a loss for black is 0 black wins, a loss for white is 1
+            losses = np.zeros(len(path))
+            losses[int(color == WHITE)::2] = 1
+            tree.update(path, losses)
+        leaf_value = self._evaluate_rollout(board, leaf_color, 0)
+        final_board = board.board.copy()
+        while len(board.move_history) > depth:
+            board.pop_move()
+        with self._lock:
+            tree.update(path, leaf_value - losses, visits=0)
+            if self.rave:
+                tree.update_amaf(path, color, final_board, leaf_value)
 
     def _evaluate_rollout(self, board, toplay,n):
         """
@@ -155,26 +400,18 @@ class MCTS(object):
         """
        
         nuPasses = 0
-        for _ in range(49):
-            
+        for _ in range(board.size * board.size):
+            if board.check_game_end_gomoku()[0]:
+                break
             color = board.current_player
-            
-            print('get move ',_)
-            move = board.get_pattern_moves()[0][0]
-            
-            print(n,"fuck off", 'move',move)
+            move = rollout_move(board, self.simulation_policy)
             if move == None:
                 nuPasses +=1
             else:
                 nuPasses = 0
-                
-                print(n,"fuck off2", move)
-                board.play_move_gomoku(move,color)
-                print(n,"fuck off33", move)
+                board.push_move(move,color)
             if nuPasses >=2:
                 break
-        if n == 205 or n==206:
-                print(n,"fuck off3")
         end,winner = board.check_game_end_gomoku()
      
         if winner == BLACK:
@@ -202,16 +439,44 @@ class MCTS(object):
             use_pattern,
             num_simulation,
             exploration,
-            simulation_policy = "rule_based"):
+            simulation_policy = "rule_based",
+            batch_size = 1,
+            pool = None,
+            workers = 1,
+            threads = 1,
+            rave = False,
+            deadline = None,
+            early_stop = 0,
+            confidence = None,
+            root_moves = None,
+            processes = 1):
         """
-        Runs all playouts sequentially and returns the most visited move.
+        Runs num_simulation playouts and returns the most visited move.
+        With a deadline, a time.time() value, the search also stops there;
+        num_simulation None then means search until the deadline.
+        With early_stop > 0, the search checks every early_stop playouts
+        whether the move is settled and stops if so, see _search;
+        confidence adds the win rate test of decision_settled.
+        With batch_size > 1 the rollouts are played batch_size at a time
+        by BatchRollout, otherwise sequentially.
+        With a multiprocessing pool and workers > 1, the search is root
+        parallel: workers trees are searched in the pool and their root
+        statistics are merged, see _root_search. The statistics of the
+        root of a tree kept for the position are merged too, so a second
+        search of the same position adds to the first.
+        With threads > 1, that many threads search the tree together,
+        on one core. With processes > 1 and no root parallel search,
+        that many processes search the tree together on their own cores,
+        each with threads threads, see _search_processes.
+        With rave, selection also uses the AMAF statistics, see rave_values.
         """
-        print("in getmove")
-        #print(self.toplay,toplay)
-        if self.toplay != toplay:
-            sys.stderr.write("Dumping the subtree! \n")
-            sys.stderr.flush()
-            self._root = TreeNode(None)
+        self.stop_pondering()
+        # keep the tree only if its root is the position searched,
+        # update_with_move follows the moves played since the last search
+        key = root_key(board, toplay)
+        if self.root_key != key:
+            self.tree = NodeStore()
+        self.root_key = key
         #self.komi = komi
         self.limit = limit
         #self.check_selfatari = check_selfatari
@@ -219,38 +484,305 @@ class MCTS(object):
         self.toplay = toplay
         self.exploration = exploration
         self.simulation_policy = simulation_policy
+        self.rave = rave
+        self.early_stop = early_stop
+        self.confidence = confidence
         #self.in_tree_knowledge = in_tree_knowledge
       
-        for n in range(98*3):#(num_simulation):
-            board_copy = board.copy()
-            self._playout(board_copy, toplay,n)
+        if pool is not None and workers > 1:
+            settings = dict(limit = limit, use_pattern = use_pattern,
+                            exploration = exploration,
+                            simulation_policy = simulation_policy,
+                            batch_size = batch_size, threads = threads,
+                            rave = rave, early_stop = early_stop,
+                            confidence = confidence, root_moves = root_moves,
+                            total = num_simulation,
+                            deadline = deadline)
+            seed = random.getrandbits(32)
+            stats = pool.map(_root_search, [(board, toplay, settings, seed + i)
+                                            for i in range(workers)])
+            if not self.tree.is_leaf(ROOT):
+                self._restrict_root(root_moves)
+                stats.append(self._root_stats())
+            self.tree = merge_roots(stats)
+            self._root_allowed = None
+        else:
+            self._restrict_root(root_moves)
+            self._search(board, toplay, batch_size, threads,
+                         num_simulation, deadline, processes)
 
         # choose a move that has the most visit 
-        moves_ls =  [(move, node._n_visits) for move, node in self._root._children.items()]
-        
-        if not moves_ls:
+        if self.tree.is_leaf(ROOT):
             return None
-        moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
-        
-        move = moves_ls[0]
-        self.print_stat(board, self._root, toplay)
-        #self.good_print(board,self._root,self.toplay,10)
-        if move[0] == PASS:
+        self.best_move = move = self._most_visited()
+        self.print_stat(board, ROOT, toplay)
+        #self.good_print(board,ROOT,self.toplay,10)
+        if move is not None:
+            assert board.is_legal_gomoku(move, toplay)
+        return move
+
+    def _search(self, board, toplay, batch_size, threads = 1,
+                total = None, deadline = None, processes = 1):
+        """
+        Run the playouts of one get_move on copies of board, until total
+        playouts are done or time.time() reaches deadline. Without either
+        limit, run 98*3 playouts. At least one playout is run if the root
+        has no children, so there is always a move.
+        With early_stop > 0, every early_stop playouts the search also
+        stops when the move is settled, see decision_settled, given the
+        playouts that are left: the rest of total, and the playouts that
+        fit before the deadline at the speed of the search so far.
+        best_move follows the most visited child of the root meanwhile.
+        With threads > 1, the threads share the tree and each plays
+        on its own copy of board, taking the playouts from a common count.
+        The rollouts hold the GIL, so the threads interleave the playouts
+        on one core. With processes > 1, that many processes share the
+        tree and run on as many cores, see _search_processes.
+        """
+        if total is None:
+            total = 98*3 if deadline is None else float('inf')
+        # the playouts left, the playouts done and the next early stop check
+        counters = np.array([total, 0, self.early_stop], dtype = np.float64)
+        if processes > 1:
+            self._search_processes(board, toplay, batch_size, threads,
+                                   processes, counters, deadline)
+        else:
+            self._search_threads(board, toplay, batch_size, threads, counters,
+                                 time.time(), deadline, threads > 1)
+
+    def _search_threads(self, board, toplay, batch_size, threads, counters,
+                        start, deadline, shared):
+        """
+        The playouts of _search in this process, taken from counters by
+        threads threads. With shared, other threads or processes search
+        the tree too, the playouts are run by _playout_shared.
+        start is the time.time() the search started.
+        """
+        if batch_size > 1 and (self._batch_rollout is None or
+                               self._batch_rollout.size != board.size):
+            self._batch_rollout = BatchRollout(board.size)
+        remaining, done, next_check = 0, 1, 2
+        def take(count):
+            with self._lock:
+                if self._stop.is_set():
+                    return 0
+                self.best_move = self._most_visited()
+                if not self.tree.is_leaf(ROOT):
+                    now = time.time()
+                    if deadline is not None and now >= deadline:
+                        return 0
+                    if self.early_stop and counters[done] >= counters[next_check]:
+                        counters[next_check] = counters[done] + self.early_stop
+                        if self._settled(toplay, counters[remaining],
+                                         counters[done], now - start,
+                                         deadline, now):
+                            return 0
+                count = int(min(count, counters[remaining]))
+                counters[remaining] -= count
+                counters[done] += count
+                return count
+        if shared:
+            playout = self._playout_shared
+        else:
+            playout = lambda board_copy, color: self._playout(board_copy, color, 0)
+        def work(board_copy):
+            while True:
+                count = take(batch_size)
+                if count == 0:
+                    return
+                if batch_size > 1:
+                    self._playout_batch(board_copy, toplay, count)
+                else:
+                    playout(board_copy, toplay)
+        if threads <= 1:
+            work(board.copy())
+            return
+        workers = [threading.Thread(target = work, args = (board.copy(),))
+                   for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def _search_processes(self, board, toplay, batch_size, threads,
+                          processes, counters, deadline):
+        """
+        Tree parallel search in processes: the tree is copied to a
+        SharedNodeStore, processes processes search it together as
+        _search_threads with shared playouts, under one lock and taking
+        the playouts from common counters, then the tree is copied back.
+        The shared tree has room for the nodes the playouts can add, at
+        most SHARED_NODES; once it is full, leaves are not expanded.
+        """
+        nodes_per_playout = len(board.get_empty_points()) + 1
+        playouts = int(min(counters[0], SHARED_NODES // nodes_per_playout))
+        capacity = self.tree.count + nodes_per_playout * (playouts + 1)
+        tree = SharedNodeStore(self.tree, capacity)
+        shared_counters = multiprocessing.RawArray(ctypes.c_double,
+                                                   counters.tolist())
+        settings = dict(exploration = self.exploration,
+                        simulation_policy = self.simulation_policy,
+                        rave = self.rave, early_stop = self.early_stop,
+                        confidence = self.confidence,
+                        root_allowed = self._root_allowed,
+                        batch_size = batch_size, threads = threads,
+                        start = time.time(), deadline = deadline)
+        lock = multiprocessing.Lock()
+        seed = random.getrandbits(32)
+        workers = [multiprocessing.Process(
+                       target = _tree_search,
+                       args = (tree, lock, shared_counters, board, toplay,
+                               settings, seed + i))
+                   for i in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.tree = tree.subtree(ROOT)
+        counters[:] = shared_counters
+        self.best_move = self._most_visited()
+
+    def _settled(self, toplay, remaining, done, elapsed, deadline, now):
+        """
+        Whether the root move is settled with at most remaining playouts
+        left, or as many as the done playouts of elapsed seconds
+        let fit before deadline.
+        """
+        if deadline is not None and elapsed > 0:
+            remaining = min(remaining, done / elapsed * (deadline - now))
+        children = self.tree.children(ROOT)
+        visits = self.tree.visits[children.start:children.stop]
+        black_wins = self.tree.black_wins[children.start:children.stop]
+        # only the moves the search may choose, see _restrict_root
+        if self._root_allowed is not None:
+            visits = visits[self._root_allowed]
+            black_wins = black_wins[self._root_allowed]
+        return decision_settled(visits, black_wins, remaining,
+                                toplay == BLACK, self.confidence)
+
+    def _restrict_root(self, root_moves):
+        """
+        Let the search choose only root_moves at the root, all moves if
+        it is None. A leaf root is expanded with root_moves only. The
+        children of a root expanded before, by an earlier search of the
+        position, are kept and the others are masked.
+        """
+        self._root_allowed = None
+        if root_moves is None:
+            return
+        tree = self.tree
+        if not tree.is_leaf(ROOT):
+            children = tree.children(ROOT)
+            allowed = np.isin(tree.move[children.start:children.stop], root_moves)
+            if allowed.any():
+                self._root_allowed = allowed
+                return
+            self.tree = tree = NodeStore()
+        moves = np.array(root_moves, dtype = np.int64)
+        if self.shuffle:
+            moves = np.random.permutation(moves)
+        tree.expand(ROOT, moves)
+
+    def _root_stats(self):
+        """
+        The moves, visits and black wins of the children of the root
+        the search may choose, see merge_roots.
+        """
+        tree = self.tree
+        children = tree.children(ROOT)
+        stats = (tree.move[children.start:children.stop],
+                 tree.visits[children.start:children.stop],
+                 tree.black_wins[children.start:children.stop])
+        if self._root_allowed is not None:
+            stats = tuple(column[self._root_allowed] for column in stats)
+        return stats
+
+    def _best_root_child(self):
+        """ The most visited child of the root the search may choose """
+        tree = self.tree
+        children = tree.children(ROOT)
+        visits = tree.visits[children.start:children.stop]
+        if self._root_allowed is not None:
+            visits = np.where(self._root_allowed, visits, -1)
+        return children.start + int(np.argmax(visits))
+
+    def root_value(self):
+        """
+        The win rate of the most visited child of the root for the player
+        to move at the root, None if the root has no visited child.
+        """
+        tree = self.tree
+        if tree.is_leaf(ROOT):
             return None
-        assert board.is_legal(move[0], toplay)
-        return move[0]
-        
-    def update_with_move(self, last_move):
+        best = self._best_root_child()
+        if tree.visits[best] == 0:
+            return None
+        value = tree.black_wins[best] / tree.visits[best]
+        return value if self.toplay == BLACK else 1.0 - value
+
+    def _most_visited(self):
+        """ The move of the most visited child of the root, None for pass """
+        tree = self.tree
+        if tree.is_leaf(ROOT):
+            return None
+        move = int(tree.move[self._best_root_child()])
+        return None if move == PASS_MOVE else move
+
+    def start_pondering(self, board, toplay, batch_size = 1, threads = 1,
+                        exploration = 0.4, simulation_policy = "rule_based",
+                        rave = False):
+        """
+        Search from board, with toplay to play, in a background thread
+        until stop_pondering, or PONDER_PLAYOUTS playouts, with the
+        settings of get_move. When the opponent's move comes,
+        update_with_move keeps its subtree, so the playouts spent on the
+        expected replies count for the next get_move.
+        """
+        self.stop_pondering()
+        key = root_key(board, toplay)
+        if self.root_key != key:
+            self.tree = NodeStore()
+        self.root_key = key
+        self.toplay = toplay
+        self.exploration = exploration
+        self.simulation_policy = simulation_policy
+        self.rave = rave
+        self._root_allowed = None
+        self._ponder_thread = threading.Thread(
+            target = self._search,
+            args = (board.copy(), toplay, batch_size, threads, PONDER_PLAYOUTS),
+            daemon = True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """ Stop the search of start_pondering and wait for it, if any """
+        if self._ponder_thread is not None:
+            self._stop.set()
+            self._ponder_thread.join()
+            self._ponder_thread = None
+            self._stop.clear()
+
+    def update_with_move(self, last_move, color, board):
         """
         Step forward in the tree, keeping everything we already know about the subtree, assuming
-        that get_move() has been called already. Siblings of the new root will be garbage-collected.
+        that get_move() has been called already. The subtree is copied to a new tree,
+        the rest of the old tree is garbage-collected.
+        Called for the moves of both players, after last_move of color is
+        played on board. The tree is dropped if it did not have color to
+        play at its root.
         """
-        if last_move in self._root._children:
-            self._root = self._root._children[last_move]
+        self.stop_pondering()
+        move = PASS_MOVE if last_move is None else last_move
+        child = NO_NODE
+        if color == self.toplay and not self.tree.is_leaf(ROOT):
+            child = self.tree.find_child(ROOT, move)
+        if child != NO_NODE:
+            self.tree = self.tree.subtree(child)
         else:
-            self._root = TreeNode(None)
-        self._root._parent = None
-        self.toplay = GoBoardUtil.opponent(self.toplay)
+            self.tree = NodeStore()
+        self.toplay = GoBoardUtil.opponent(color)
+        self.root_key = root_key(board, self.toplay)
+        self._root_allowed = None
 
     def point_to_string(self, board_size, point):
         if point == None:
@@ -267,82 +799,77 @@ class MCTS(object):
             raise ValueError("Provided integer value for color is invalid")
 
     def good_print(self, board, node, color, num_nodes):
+        tree = self.tree
         cboard = board.copy()
         sys.stderr.write("\nTaking a tour of selection policy in tree! \n\n")
-        sys.stderr.write(str(cboard.get_twoD_board()))
+        sys.stderr.write(str(GoBoardUtil.get_twoD_board(cboard)))
         sys.stderr.flush()
-        while not node.is_leaf():
-            if node._move != None:
-                if node._move != PASS:
-                    pointString = self.point_to_string(board.size, node._move)
-                else:
-                    pointString = node._move
+        while not tree.is_leaf(node):
+            if node != ROOT:
+                pointString = self.move_to_string(board.size, tree.move[node])
             else: 
                 pointString = 'Root'
+            children = tree.children(node)
             sys.stderr.write("\nMove: {} Numebr of children {}, Number of visits: {}\n"
-                .format(pointString,len(node._children),node._n_visits))
+                .format(pointString,len(children),tree.visits[node]))
             sys.stderr.flush()
-            moves_ls = []
             max_flag = color == BLACK
-            for move,child in node._children.items():
-                uctval = uct_val(node,child,self.exploration,max_flag)
-                moves_ls.append((move,uctval,child))
-            moves_ls = sorted(moves_ls,key=lambda i:i[1],reverse=True)
+            uctvals = uct_values(tree.visits[node],
+                                 tree.visits[children.start:children.stop],
+                                 tree.black_wins[children.start:children.stop],
+                                 self.exploration, max_flag)
+            moves_ls = sorted(zip(children, uctvals), key=lambda i:i[1], reverse=True)
 
             if moves_ls:
                 sys.stderr.write("\nPrinting {} of {} childs that have highest UCT value \n\n".format(num_nodes, pointString))
                 sys.stderr.flush()
-                for i in range(num_nodes):
-                    move = moves_ls[i][0]
-                    child_val = moves_ls[i][1]
-                    child_node = moves_ls[i][2]
-                    if move !=PASS:
-                        sys.stderr.write("\nChild point:{} ;UCT Value {}; Number of visits: {}; Number of Black wins: {}\n"
-                            .format(self.point_to_string(cboard.size, move), child_val, child_node._n_visits, child_node._black_wins))
-                        sys.stderr.flush()
-                    else:
-                        sys.stderr.write("\nChild point:{} ;UCT Value {}; Number of visits: {}; Number of Black wins: {} \n"
-                            .format(move, child_val, child_node._n_visits, child_node._black_wins))
-                        sys.stderr.flush()
+                for child, child_val in moves_ls[:num_nodes]:
+                    sys.stderr.write("\nChild point:{} ;UCT Value {}; Number of visits: {}; Number of Black wins: {}\n"
+                        .format(self.move_to_string(cboard.size, tree.move[child]), child_val, tree.visits[child], tree.black_wins[child]))
+                    sys.stderr.flush()
             # Greedily select next move.                
-            max_flag = color == BLACK
-            move, next_node = node.select(self.exploration,max_flag)
-            if move==PASS:
+            node = self._select_child(node, max_flag)
+            move = int(tree.move[node])
+            if move == PASS_MOVE:
                 move = None
-            assert cboard.is_legal(move, color)
+            assert move is None or cboard.is_legal_gomoku(move, color)
             pointString = self.point_to_string(cboard.size, move)
-            cboard.play_move_gomoku(move, color)
+            cboard.push_move(move, color)
             sys.stderr.write("\nBoard in simulation after chosing child {} in tree. \n".format(pointString))
-            sys.stderr.write(str(cboard.get_twoD_board()))
+            sys.stderr.write(str(GoBoardUtil.get_twoD_board(cboard)))
             sys.stderr.flush()
             color = GoBoardUtil.opponent(color) 
-            node = next_node
-        assert node.is_leaf()
+        assert tree.is_leaf(node)
         cboard.current_player = color
-        leaf_value = self._evaluate_rollout(cboard, color)  
+        leaf_value = self._evaluate_rollout(cboard, color, 0)
         sys.stderr.write("\nWinner of simulation is: {} color, Black is 0 an \n".format(leaf_value))
         sys.stderr.flush()
 
+    def move_to_string(self, board_size, move):
+        """ point_to_string of a move of the tree """
+        move = int(move)
+        return self.point_to_string(board_size, None if move == PASS_MOVE else move)
+
     def print_stat(self, board, root, color):
+        tree = self.tree
         s_color = self.int_to_color(color)
-        sys.stderr.write("Numebr of children {} \n".format(len(root._children)))
+        children = tree.children(root)
+        sys.stderr.write("Numebr of children {} \n".format(len(children)))
         sys.stderr.flush()
-        sys.stderr.write("Number of roots visits: {} \n".format(root._n_visits))
+        sys.stderr.write("Number of roots visits: {} \n".format(tree.visits[root]))
         sys.stderr.flush()
         stats=[]
-        for move,node in root._children.items():
+        for child in children:
             if color == BLACK:
-                wins = node._black_wins
+                wins = tree.black_wins[child]
             else:
-                wins = node._n_visits - node._black_wins
-            visits = node._n_visits
+                wins = tree.visits[child] - tree.black_wins[child]
+            visits = int(tree.visits[child])
             if visits:
                 win_rate = round(float(wins)/visits,2)    
             else:
                 win_rate = 0
-            if move==PASS:
-                move = None
-            pointString = self.point_to_string(board.size, move)
-            stats.append((pointString,win_rate,wins,visits))
+            pointString = self.move_to_string(board.size, tree.move[child])
+            stats.append((pointString,win_rate,float(wins),visits))
         sys.stderr.write("Statistics: {} \n".format(sorted(stats,key=lambda i:i[3],reverse=True)))
         sys.stderr.flush()
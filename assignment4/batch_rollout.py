@@ -0,0 +1,182 @@
+#!/usr/local/bin/python3
+#/usr/bin/python3
+# Set the path to your python3 above
+
+"""
+batch_rollout.py
+
+Plays many independent Gomoku rollouts in lockstep with NumPy.
+
+The games are the rows of an (N, maxpoint) array, in the padded
+one-dimensional layout of SimpleGoBoard, so lines never wrap around the
+edge and the pattern windows of SimpleGoBoard can be used as they are.
+Every step plays one move in all unfinished games at once:
+random:     a random empty point
+rule_based: a random move of the most urgent threat, see threat_moves
+otherwise:  the best move of the pattern scores, see get_pattern_moves
+The window codes, and the pattern scores when they are needed, are
+updated only for the windows through the points just played.
+"""
+
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, BORDER
+from pattern_compiler import WINDOW, CODE_WEIGHTS
+from simple_board import SimpleGoBoard, THREAT_CATEGORIES, \
+                         _threat_counts, _code_scores
+
+STONE_SCORE = -2000000
+
+def _compact_threats(counts):
+    """
+    For every window code and player: the most urgent threat category
+    found in the window, len(THREAT_CATEGORIES) if none, and the bit mask
+    of the offsets of its responses.
+    """
+    present = counts.any(axis = 3)
+    first = np.where(present.any(axis = 2), present.argmax(axis = 2),
+                     len(THREAT_CATEGORIES)).astype(np.uint8)
+    responses = np.take_along_axis(
+        counts, np.minimum(first, counts.shape[2] - 1)[..., None, None],
+        axis = 2)[:, :, 0, :] > 0
+    mask = (responses * (1 << np.arange(WINDOW))).sum(axis = 2)
+    mask[first == len(THREAT_CATEGORIES)] = 0
+    return first, mask.astype(np.uint8)
+
+_threat_first, _threat_mask = _compact_threats(_threat_counts)
+
+class BatchRollout(object):
+    """
+    Rollouts on boards of one size. The tables only depend on the size,
+    create one object per size and reuse it.
+    """
+
+    def __init__(self, size):
+        board = SimpleGoBoard(size)
+        self.size = size
+        self.maxpoint = board.maxpoint
+        self.NS = board.NS
+        self._base_score = board._base_score
+        # an extra window at the end stands for "no window",
+        # it only has BORDER points and its code never changes
+        self._dummy = len(board._window_points)
+        self._window_points = np.vstack([board._window_points,
+                                         np.zeros(WINDOW, dtype = np.int64)])
+        # for each point, the windows through it and the weight of the
+        # point's digit in their codes, padded with the dummy window
+        through = board._windows_through
+        width = max(len(windows) for windows in through)
+        self._windows_of = np.full((self.maxpoint, width), self._dummy)
+        self._weights_of = np.zeros((self.maxpoint, width), dtype = np.int64)
+        for point, windows in enumerate(through):
+            if board.board[point] == BORDER:
+                continue
+            offsets = np.argmax(self._window_points[windows] == point, axis = 1)
+            self._windows_of[point, :len(windows)] = windows
+            self._weights_of[point, :len(windows)] = CODE_WEIGHTS[offsets]
+        # where the scores of the points of each window go in the
+        # (2, maxpoint) scores of a game, shaped like _code_scores
+        self._targets = np.arange(2)[:, None] * self.maxpoint + \
+            self._window_points[:, None, :]
+
+    def _five(self, boards, colors):
+        """
+        Which boards have five stones of their color in a row,
+        from the sums of five points along each line direction.
+        """
+        stones = (boards == colors[:, None]).astype(np.int8)
+        length = stones.shape[1]
+        found = np.zeros(len(boards), dtype = bool)
+        for shift in [1, self.NS, self.NS + 1, self.NS - 1]:
+            end = length - 4 * shift
+            sums = sum(stones[:, k * shift : k * shift + end] for k in range(5))
+            found |= (sums == 5).any(axis = 1)
+        return found
+
+    def _pattern_scores(self, boards, codes):
+        """ The scores of get_pattern_moves, for both players """
+        total = self._add_scores(_code_scores[codes],
+                                 self._targets[None])
+        base = np.where(boards == EMPTY, self._base_score, STONE_SCORE)
+        return total + base[:, None, :]
+
+    def _add_scores(self, scores, targets):
+        """
+        Sum the (games, windows, 2, WINDOW) window scores into
+        (games, 2, maxpoint) scores, targets are the _targets of the windows.
+        """
+        games = len(scores)
+        size = 2 * self.maxpoint
+        flat = targets + (np.arange(games) * size)[:, None, None, None]
+        total = np.bincount(flat.ravel(), weights = scores.ravel(),
+                            minlength = games * size)
+        return total.astype(np.int64).reshape(games, 2, self.maxpoint)
+
+    def _candidates(self, boards, codes, colors):
+        """ The moves of the rule based policy, as a boolean array """
+        first = _threat_first[codes, (colors - 1)[:, None]]
+        category = first.min(axis = 1)
+        threat = category < len(THREAT_CATEGORIES)
+        games, windows = np.nonzero((first == category[:, None]) &
+                                    threat[:, None])
+        masks = _threat_mask[codes[games, windows], colors[games] - 1]
+        bits = (masks[:, None] >> np.arange(WINDOW)) & 1
+        rows, offsets = np.nonzero(bits)
+        candidates = np.zeros(boards.shape, dtype = bool)
+        candidates[games[rows],
+                   self._window_points[windows[rows], offsets]] = True
+        candidates[~threat] = boards[~threat] == EMPTY
+        return candidates
+
+    def run(self, boards, to_play, simulation_policy = None, rng = None):
+        """
+        Play the games on boards to the end.
+        boards -- (N, maxpoint) array of board arrays, modified in place
+        to_play -- (N,) array of the colors to play
+        Returns the (N,) array of the winners, EMPTY for a draw.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        boards = np.asarray(boards)
+        to_play = np.array(to_play)
+        count = len(boards)
+        winners = np.full(count, EMPTY, dtype = np.int64)
+        for color in (BLACK, WHITE):
+            colors = np.full(count, color)
+            winners[self._five(boards, colors)] = color
+        empties = (boards == EMPTY).sum(axis = 1)
+        codes = np.hstack([boards[:, self._window_points[:self._dummy]]
+                           @ CODE_WEIGHTS,
+                           np.zeros((count, 1), dtype = np.int64)])
+        use_scores = simulation_policy not in ("random", "rule_based")
+        if use_scores:
+            scores = self._pattern_scores(boards, codes)
+        games = np.nonzero((winners == EMPTY) & (empties > 0))[0]
+        while len(games):
+            colors = to_play[games]
+            if use_scores:
+                moves = scores[games, colors - 1].argmax(axis = 1)
+            else:
+                if simulation_policy == "random":
+                    candidates = boards[games] == EMPTY
+                else:
+                    candidates = self._candidates(boards[games], codes[games],
+                                                  colors)
+                keys = rng.random(candidates.shape)
+                keys[~candidates] = -1
+                moves = keys.argmax(axis = 1)
+            boards[games, moves] = colors
+            windows = self._windows_of[moves]
+            old = codes[games[:, None], windows]
+            new = old + colors[:, None] * self._weights_of[moves]
+            codes[games[:, None], windows] = new
+            if use_scores:
+                scores[games] += self._add_scores(
+                    _code_scores[new] - _code_scores[old],
+                    self._targets[windows])
+                scores[games, :, moves] += \
+                    STONE_SCORE - self._base_score[moves][:, None]
+            won = self._five(boards[games], colors)
+            winners[games[won]] = colors[won]
+            empties[games] -= 1
+            to_play[games] = WHITE + BLACK - colors
+            games = games[~won & (empties[games] > 0)]
+        return winners
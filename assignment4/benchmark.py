@@ -0,0 +1,84 @@
+#!/usr/local/bin/python3
+#/usr/bin/python3
+# Set the path to your python3 above
+
+"""
+benchmark.py
+Microbenchmarks for the hot paths of the Gomoku5 player.
+Run as: python3 benchmark.py
+"""
+
+import timeit
+import numpy as np
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from bit_board import BitGoBoard
+from batch_rollout import BatchRollout
+from GomokuMCTS import uct_values
+
+def midgame_board(board_class, size=7):
+    """ A board with a few stones on it, so copies are not trivial """
+    board = board_class(size)
+    color = BLACK
+    for row, col in [(4, 4), (4, 5), (3, 3), (5, 5), (3, 5), (5, 3)]:
+        board.play_move_gomoku(board.pt(row, col), color)
+        color = WHITE + BLACK - color
+    return board
+
+def per_second(fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=3))
+    return number / seconds
+
+def bench_copy(number=20000):
+    for board_class in [SimpleGoBoard, BitGoBoard]:
+        board = midgame_board(board_class)
+        rate = per_second(board.copy, number)
+        print("{:<16} copy:  {:>12,.0f} per second".format(
+            board_class.__name__, rate))
+
+def bench_pattern_moves(number=2000):
+    """ A rollout step: ask for the best pattern move, play it, take it back """
+    board = midgame_board(SimpleGoBoard)
+    def step():
+        move = board.get_pattern_moves()[0][0]
+        board.push_move(move, board.current_player)
+        board.pop_move()
+    rate = per_second(step, number)
+    print("{:<16} pattern move step: {:>8,.0f} per second".format(
+        "SimpleGoBoard", rate))
+
+def bench_rollouts(number=20, batch=256):
+    """ Whole rollouts from a midgame board, one at a time and batched """
+    board = midgame_board(SimpleGoBoard)
+    def rollout():
+        b = board.copy()
+        while b.winner is None and len(b.get_empty_points()):
+            b.play_move_gomoku(b.get_pattern_moves()[0][0], b.current_player)
+    rate = per_second(rollout, number)
+    print("{:<16} pattern rollouts: {:>9,.0f} per second".format(
+        "SimpleGoBoard", rate))
+    batch_rollout = BatchRollout(board.size)
+    for policy in ["random", "rule_based", None]:
+        def batched():
+            batch_rollout.run(np.tile(board.board, (batch, 1)),
+                              np.full(batch, board.current_player), policy)
+        rate = per_second(batched, max(1, number // 10)) * batch
+        print("{:<16} {} rollouts: {:>9,.0f} per second".format(
+            "BatchRollout", policy or "pattern", rate))
+
+def bench_uct(number=20000, children=50):
+    """ UCT values of the children of one node, a step of selection """
+    rng = np.random.default_rng(1)
+    visits = rng.integers(0, 30, children)
+    black_wins = rng.random(children) * visits
+    parent_visits = int(visits.sum())
+    def select():
+        np.argmax(uct_values(parent_visits, visits, black_wins, 0.4, True))
+    rate = per_second(select, number)
+    print("{:<16} UCT selection: {:>12,.0f} per second".format("MCTS", rate))
+
+if __name__ == '__main__':
+    bench_copy()
+    bench_pattern_moves()
+    bench_rollouts()
+    bench_uct()
@@ -0,0 +1,350 @@
+"""
+bit_board.py
+
+Implements a Gomoku board with the same interface as SimpleGoBoard,
+but the stones are stored as two Python-int bitboards, one per color.
+
+Bit number i of a bitboard is the point i of the padded 1-dimensional
+representation used by SimpleGoBoard (see GoBoardUtil.coord_to_point),
+so points, moves and GTP coordinates are interchangeable between both
+boards.  The BORDER column between rows is never set in a bitboard, so
+shifting a bitboard along a line can not wrap around to the next row.
+
+The pattern code of SimpleGoBoard is run on a SimpleGoBoard kept in step
+with the bitboards, see _pattern_board. It makes the bitboard faster
+than SimpleGoBoard with the random simulation policy only: with the
+pattern policies, it is about as fast.
+"""
+
+import numpy as np
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
+                       PASS, is_black_white, coord_to_point, MAXSIZE, \
+                       zobrist_keys, where1d
+
+"""
+The masks and the Zobrist hash keys only depend on the board size,
+they are computed once per size and shared by all boards of that size.
+"""
+_masks_of_size = {}
+_mask_attributes = ('_shifts', '_on_board', '_lines', '_zobrist',
+                    '_white_to_play_key')
+
+class BitGoBoard(object):
+
+    def __init__(self, size):
+        """
+        Creates a Gomoku board of given size
+        """
+        assert 2 <= size <= MAXSIZE
+        self.reset(size)
+
+    def reset(self, size):
+        """
+        Creates a start state, an empty board with the given size
+        """
+        self.size = size
+        self.NS = size + 1
+        self.WE = 1
+        self.ko_recapture = None
+        self.current_player = BLACK
+        self.winner = None
+        self._winning_point = None
+        self.move_history = []
+        self.maxpoint = size * size + 3 * (size + 1)
+        # the SimpleGoBoard of the pattern code and the stones it has,
+        # see _pattern_board
+        self._patterns = None
+        self._pattern_stones = (0, 0)
+        # indexed by color, only BLACK and WHITE are used
+        self._stones = [0, 0, 0]
+        if size not in _masks_of_size:
+            self._initialize_masks()
+            _masks_of_size[size] = (self._shifts, self._on_board, self._lines,
+                                    zobrist_keys(self.maxpoint))
+        self._use_masks()
+        self._stone_hash = 0
+        # the empty points, kept as an array as well: get_empty_points
+        # is called for every move of a rollout
+        self._empty = np.zeros(self.maxpoint, dtype = np.bool_)
+        self._empty[self._points_of(self._on_board)] = True
+
+    def _use_masks(self):
+        """ Point the board to the masks and keys of its size """
+        self._shifts, self._on_board, self._lines, \
+            (self._zobrist, self._white_to_play_key) = _masks_of_size[self.size]
+
+    def __getstate__(self):
+        """
+        Pickle only the state of the game, the masks of the size
+        are shared and are looked up again when unpickled.
+        """
+        state = dict(self.__dict__)
+        for name in _mask_attributes:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        if state['size'] not in _masks_of_size:
+            BitGoBoard(state['size'])
+        self.__dict__.update(state)
+        self._use_masks()
+
+    def _initialize_masks(self):
+        """
+        precompute the mask of all points on the board, and for each
+        point and each of the four directions the mask of the line
+        segment of at most 9 points centered on that point.
+        Any five in a row inside such a segment goes through its center.
+        """
+        self._shifts = (1, self.NS, self.NS + 1, self.NS - 1)
+        self._on_board = 0
+        for row in range(1, self.size + 1):
+            for col in range(1, self.size + 1):
+                self._on_board |= 1 << self.pt(row, col)
+        self._lines = []
+        for point in range(self.maxpoint):
+            lines = []
+            for shift in self._shifts:
+                mask = 0
+                if (self._on_board >> point) & 1:
+                    for sign in (1, -1):
+                        p = point
+                        for _ in range(4):
+                            p += sign * shift
+                            if not (0 <= p < self.maxpoint) or \
+                                    not (self._on_board >> p) & 1:
+                                break
+                            mask |= 1 << p
+                    mask |= 1 << point
+                lines.append(mask)
+            self._lines.append(tuple(lines))
+        self._lines = tuple(self._lines)
+
+    def copy(self):
+        b = BitGoBoard.__new__(BitGoBoard)
+        b.__dict__.update(self.__dict__)
+        b._stones = list(self._stones)
+        b.move_history = list(self.move_history)
+        b._empty = np.copy(self._empty)
+        if self._patterns is not None:
+            b._patterns = self._patterns.copy()
+        return b
+
+    @property
+    def board(self):
+        """
+        The board as a padded 1-dimensional numpy array, in the same
+        encoding as SimpleGoBoard.board. It is rebuilt on every access,
+        so it should only be used for display and debugging.
+        """
+        board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        for point in self._points_of(self._on_board):
+            board[point] = EMPTY
+        for color in (BLACK, WHITE):
+            for point in self._points_of(self._stones[color]):
+                board[point] = color
+        return board
+
+    def _points_of(self, bits):
+        """ Array of the points whose bits are set, in increasing order """
+        # unpacking the bytes with numpy is faster than any loop in Python
+        data = np.frombuffer(bits.to_bytes((self.maxpoint + 7) // 8, 'little'),
+                             dtype = np.uint8)
+        return np.unpackbits(data, bitorder = 'little').nonzero()[0]
+
+    def get_color(self, point):
+        bit = 1 << int(point)
+        if self._stones[BLACK] & bit:
+            return BLACK
+        if self._stones[WHITE] & bit:
+            return WHITE
+        if self._on_board & bit:
+            return EMPTY
+        return BORDER
+
+    def pt(self, row, col):
+        return coord_to_point(row, col, self.size)
+
+    def row_start(self, row):
+        assert row >= 1
+        assert row <= self.size
+        return row * self.NS + 1
+
+    def get_empty_points(self):
+        """
+        Return:
+            The empty points on the board, a numpy array as in SimpleGoBoard
+        """
+        return where1d(self._empty).astype(np.int32)
+
+    def is_legal(self, point, color):
+        """
+        Every empty point is legal in gomoku
+        """
+        assert is_black_white(color)
+        if point == PASS:
+            return True
+        return self.is_legal_gomoku(point, color)
+
+    def is_legal_gomoku(self, point, color):
+        """
+            Check whether it is legal for color to play on point, for the game of gomoku
+            """
+        return self.get_color(point) == EMPTY
+
+    def play_move(self, point, color):
+        """
+        Only passing is supported outside of play_move_gomoku
+        """
+        assert is_black_white(color)
+        if point == PASS:
+            self.ko_recapture = None
+            self.current_player = GoBoardUtil.opponent(color)
+            return True
+        return self.play_move_gomoku(point, color)
+
+    def play_move_gomoku(self, point, color):
+        """
+            Play a move of color on point, for the game of gomoku
+            Returns boolean: whether move was legal
+            """
+        assert is_black_white(color)
+        assert point != PASS
+        point = int(point)
+        bit = 1 << point
+        stones = self._stones
+        if (stones[BLACK] | stones[WHITE]) & bit or not self._on_board & bit:
+            return False
+        stones[color] |= bit
+        self._stone_hash ^= self._zobrist[color][point]
+        self._empty[point] = False
+        self.current_player = GoBoardUtil.opponent(color)
+        if self.winner is None and self._has_five_through(point, stones[color]):
+            self.winner = color
+            self._winning_point = point
+        return True
+
+    def hash(self):
+        """
+        64-bit Zobrist hash of the position, including the player to move.
+        The stones are hashed incrementally as they are played and taken back.
+        """
+        if self.current_player == WHITE:
+            return self._stone_hash ^ self._white_to_play_key
+        return self._stone_hash
+
+    def undo(self, point):
+        """
+            Take back the stone on point, for the game of gomoku.
+            The stone's owner becomes the player to move again.
+            """
+        point = int(point)
+        color = self.get_color(point)
+        assert is_black_white(color)
+        self._stones[color] &= ~(1 << point)
+        self._stone_hash ^= self._zobrist[color][point]
+        self._empty[point] = True
+        self.current_player = color
+        if point == self._winning_point:
+            self.winner = None
+            self._winning_point = None
+
+    def push_move(self, point, color):
+        """
+            Play a gomoku move or a pass of color and remember it,
+            so it can be taken back by pop_move.
+            Returns boolean: whether move was legal
+            """
+        previous_player = self.current_player
+        if point == PASS:
+            self.current_player = GoBoardUtil.opponent(color)
+        elif not self.play_move_gomoku(point, color):
+            return False
+        self.move_history.append((point, previous_player))
+        return True
+
+    def pop_move(self):
+        """
+            Take back the last move played by push_move and
+            restore the state from before that move.
+            Returns the move.
+            """
+        point, previous_player = self.move_history.pop()
+        if point != PASS:
+            self.undo(point)
+        self.current_player = previous_player
+        return point
+
+    def _has_five_through(self, point, stones):
+        """
+        Check if stones has five in a row through point,
+        with a few shift-and-AND operations per direction.
+        """
+        for shift, mask in zip(self._shifts, self._lines[point]):
+            line = stones & mask
+            run = line & (line >> shift)          # two in a row
+            run &= run >> (2 * shift)             # four in a row
+            if run & (line >> (4 * shift)):       # five in a row
+                return True
+        return False
+
+    def point_check_game_end_gomoku(self, point):
+        """
+            Check if the point causes the game end for the game of Gomoko.
+            """
+        color = self.get_color(point)
+        if not is_black_white(color):
+            return False
+        return self._has_five_through(int(point), self._stones[color])
+
+    def check_game_end_gomoku(self):
+        """
+            Check if the game ends for the game of Gomoku.
+            """
+        if self.winner is not None:
+            return True, self.winner
+        return False, None
+
+    def solve(self):
+        from simple_board import SimpleGoBoard
+        return SimpleGoBoard.solve(self)
+
+    def _pattern_board(self):
+        """
+        The pattern code works on the numpy board array,
+        run it on an equivalent SimpleGoBoard. That board is built on the
+        first call. After that, only the points whose stones changed since
+        the last call are set on it, and its window codes are updated for
+        those points, see SimpleGoBoard._update_score_board.
+        Moves and undos cost nothing more until the next pattern query,
+        but a query costs about as much as on a SimpleGoBoard: with a
+        pattern policy, the bitboard is not faster than the array board.
+        """
+        stones = (self._stones[BLACK], self._stones[WHITE])
+        patterns = self._patterns
+        if patterns is None:
+            from simple_board import SimpleGoBoard
+            patterns = self._patterns = SimpleGoBoard(self.size)
+            patterns.board = self.board
+            patterns._initialize_score_board()
+        elif stones != self._pattern_stones:
+            changed = (stones[0] ^ self._pattern_stones[0]) | \
+                      (stones[1] ^ self._pattern_stones[1])
+            for point in self._points_of(changed):
+                patterns.board[point] = self.get_color(point)
+                patterns._changed_points.append(point)
+        self._pattern_stones = stones
+        patterns.current_player = self.current_player
+        return patterns
+
+    def get_pattern_moves(self):
+        return self._pattern_board().get_pattern_moves()
+
+    def threat_moves(self, color = None):
+        return self._pattern_board().threat_moves(color)
+
+    def list_solve_point(self):
+        return self._pattern_board().list_solve_point()
+
+    def forced_moves(self, color = None):
+        return self._pattern_board().forced_moves(color)
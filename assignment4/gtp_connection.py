@@ -13,6 +13,15 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
 import numpy as np
 import re
 import signal
+import time
+from time_manager import TimeManager
+
+"""
+TIME_MARGIN: seconds of the time of genmove kept for answering,
+the search stops that long before the time is up, or at half the time
+if it is short.
+"""
+TIME_MARGIN = 0.5
 
 class GtpConnection():
 
@@ -56,9 +65,13 @@ class GtpConnection():
             "solve": self.solve_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "policy_moves": self.display_pattern_moves,
+            "workers": self.workers_cmd,
+            "time_settings": self.time_settings_cmd,
+            "time_left": self.time_left_cmd
         }
         self.timelimit=60
+        self.time_manager = TimeManager(self.timelimit)
 
         # used for argument checking
         # values: (required number of arguments, 
@@ -70,14 +83,33 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "workers": (1, 'Usage: workers INT'),
+            "timelimit": (1, 'Usage: timelimit SECONDS'),
+            "time_settings": (3, 'Usage: time_settings MAIN_TIME BYO_YOMI_TIME BYO_YOMI_STONES'),
+            "time_left": (3, 'Usage: time_left {b,w} TIME STONES')
         }
     
     def set_playout_policy(self, args):
         playout_policy=args[0]
+        if playout_policy not in ('random', 'rule_based'):
+            self.error('Usage: set playout policy {random, rule_based}')
+            return
         self.go_engine.set_playout_policy(playout_policy)
         self.respond()
 
+    def workers_cmd(self, args):
+        """ Set the number of processes of the search """
+        try:
+            workers = int(args[0])
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            self.error('Usage: workers INT')
+            return
+        self.go_engine.set_workers(workers)
+        self.respond()
+
     def display_pattern_moves(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
         color=self.board.current_player
@@ -133,6 +165,8 @@ class GtpConnection():
         command_name = elements[0]; args = elements[1:]
         if self.has_arg_error(command_name, len(args)):
             return
+        # a search on the opponent's time ends with the next command
+        self.go_engine.stop_pondering()
         if command_name in self.commands:
             try:
                 self.commands[command_name](args)
@@ -187,6 +221,7 @@ class GtpConnection():
 
     def quit_cmd(self, args):
         """ Quit game and exit the GTP interface """
+        self.go_engine.shutdown()
         self.respond()
         exit()
 
@@ -261,6 +296,7 @@ class GtpConnection():
             if args[1].lower() == 'pass':
                 self.board.play_move(PASS, color)
                 self.board.current_player = GoBoardUtil.opponent(color)
+                self.go_engine.update(self.board, PASS, color)
                 self.respond()
                 return
             coord = move_to_coord(args[1], self.board.size)
@@ -276,14 +312,51 @@ class GtpConnection():
             else:
                 self.debug_msg("Move: {}\nBoard:\n{}\n".
                                 format(board_move, self.board2d()))
+            self.go_engine.update(self.board, move, color)
             self.respond()
         except Exception as e:
             self.respond('{}'.format(str(e)))
 
     def timelimit_cmd(self, args):
-        self.timelimit = args[0]
+        """ Set the seconds of a move without a game clock, and of solve """
+        try:
+            timelimit = float(args[0])
+        except ValueError:
+            timelimit = 0
+        if timelimit <= 0:
+            self.error('Usage: timelimit SECONDS')
+            return
+        self.timelimit = timelimit
+        self.time_manager.move_time = timelimit
         self.respond('')
 
+    def time_settings_cmd(self, args):
+        """ Set the game clock: main time, then byo-yomi periods """
+        try:
+            main_time, byo_yomi_time, byo_yomi_stones = \
+                float(args[0]), float(args[1]), int(args[2])
+        except ValueError:
+            main_time = -1
+        if main_time < 0:
+            self.error('Usage: time_settings MAIN_TIME BYO_YOMI_TIME BYO_YOMI_STONES')
+            return
+        self.time_manager.time_settings(main_time, byo_yomi_time,
+                                        byo_yomi_stones)
+        self.respond()
+
+    def time_left_cmd(self, args):
+        """ Set the time left on the clock of color args[0] """
+        try:
+            seconds, stones = float(args[1]), int(args[2])
+        except ValueError:
+            stones = -1
+        if args[0].lower() not in ('b', 'w') or stones < 0:
+            self.error('Usage: time_left {b,w} TIME STONES')
+            return
+        color = color_to_int(args[0].lower())
+        self.time_manager.time_left(color, seconds, stones)
+        self.respond()
+
     def handler(self, signum, fram):
         self.board = self.sboard
         raise Exception("unknown")
@@ -324,16 +397,23 @@ class GtpConnection():
             self.respond("pass")
             return
         move=None
+        # the engine searches until the deadline and stops by itself,
+        # the time of the move comes from the time manager
+        start = time.time()
+        empty_points = len(moves)
+        budget = self.time_manager.budget(
+            color, empty_points, self.go_engine.urgency(self.board, color))
+        deadline = start + max(budget - TIME_MARGIN, budget / 2)
         try:
-            signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
-            #print(self.board.current_player)
-            move = self.go_engine.get_move(self.board, color)
-            
-            self.board=self.sboard
-            signal.alarm(0)
+            move = self.go_engine.get_move(self.board, color, deadline)
+            extra = self.time_manager.extension(color, empty_points,
+                                                self.go_engine.root_value())
+            if extra > 0:
+                move = self.go_engine.get_move(self.board, color,
+                                               time.time() + extra)
         except Exception as e:
             move=self.go_engine.best_move
+        self.time_manager.used(color, time.time() - start)
 
         if move == PASS:
             self.respond("pass")
@@ -342,7 +422,9 @@ class GtpConnection():
         move_as_string = format_point(move_coord)
         if self.board.is_legal_gomoku(move, color):
             self.board.play_move_gomoku(move, color)
+            self.go_engine.update(self.board, move, color)
             self.respond(move_as_string)
+            self.go_engine.ponder(self.board, GoBoardUtil.opponent(color))
         else:
             self.respond("illegal move: {}".format(move_as_string))
 
@@ -388,7 +470,7 @@ class GtpConnection():
         for row in range(size-1, -1, -1):
             start = self.board.row_start(row + 1)
             for i in range(size):
-                point = self.board.board[start + i]
+                point = self.board.get_color(start + i)
                 if point == BLACK:
                     str += 'X'
                 elif point == WHITE:
@@ -423,7 +505,13 @@ class GtpConnection():
                      )
 
     def list_solve_point_cmd(self, args):
-        self.respond(self.board.list_solve_point())
+        moves = self.board.list_solve_point()
+        if moves is None:
+            self.respond()
+            return
+        gtp_moves = [format_point(point_to_coord(move, self.board.size))
+                     for move in moves]
+        self.respond(' '.join(sorted(gtp_moves)))
 
 def point_to_coord(point, boardsize):
     """
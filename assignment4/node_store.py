@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+"""
+node_store.py
+
+The MCTS tree as parallel NumPy arrays, indexed by node number.
+For each node: the number of visits, the number of black wins, the
+parent, the move that leads to it, and its children. The children of a
+node are created together by expand and numbered consecutively, from
+first_child to first_child + child_count, so the statistics of all
+children of a node are contiguous slices of the arrays.
+
+Node ROOT is the root. Moves are board points; PASS_MOVE, point 0,
+which is always on the BORDER, stands for a pass.
+
+The AMAF (all moves as first) statistics of a node count the playouts
+through its parent in which its move was played later on by the same
+player, see update_amaf. They are only kept up to date by RAVE search.
+
+SharedNodeStore keeps the arrays in shared memory, so the processes of
+a tree parallel search can search the same tree.
+"""
+
+import ctypes
+import multiprocessing
+import numpy as np
+from board_util import BLACK, WHITE
+
+NO_NODE = -1
+PASS_MOVE = 0
+
+class NodeStore(object):
+    ROOT = 0
+    _fields = ('visits', 'black_wins', 'amaf_visits', 'amaf_black_wins',
+               'parent', 'first_child', 'child_count', 'move')
+    # the fields subtree copies as they are, the others are renumbered
+    _copied = ('visits', 'black_wins', 'amaf_visits', 'amaf_black_wins', 'move')
+
+    def __init__(self, capacity = 1024):
+        """
+        A tree with only the root, with room for capacity nodes
+        before the arrays have to grow.
+        """
+        self.visits = np.zeros(capacity, dtype = np.int64)
+        self.black_wins = np.zeros(capacity, dtype = np.float64)
+        self.amaf_visits = np.zeros(capacity, dtype = np.int64)
+        self.amaf_black_wins = np.zeros(capacity, dtype = np.float64)
+        self.parent = np.full(capacity, NO_NODE, dtype = np.int32)
+        self.first_child = np.zeros(capacity, dtype = np.int32)
+        self.child_count = np.zeros(capacity, dtype = np.int32)
+        self.move = np.zeros(capacity, dtype = np.int32)
+        self.count = 1
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        """ Bytes used per node times the number of nodes in use """
+        return self.count * sum(getattr(self, name).itemsize
+                                for name in self._fields)
+
+    def _allocate(self, count):
+        """
+        Reserve count consecutive nodes, return the first one.
+        The arrays double in size when they are full.
+        """
+        start = self.count
+        if start + count > len(self.visits):
+            capacity = max(2 * len(self.visits), start + count)
+            for name in self._fields:
+                old = getattr(self, name)
+                new = np.zeros(capacity, dtype = old.dtype)
+                new[:start] = old[:start]
+                setattr(self, name, new)
+            self.parent[start:] = NO_NODE
+        self.count += count
+        return start
+
+    def has_room(self, count):
+        """ Whether count more nodes fit, always, the arrays grow """
+        return True
+
+    def is_leaf(self, node):
+        return self.child_count[node] == 0
+
+    def children(self, node):
+        """ The range of the numbers of the children of node """
+        first = int(self.first_child[node])
+        return range(first, first + int(self.child_count[node]))
+
+    def expand(self, node, moves):
+        """
+        Create the children of the leaf node, one for each move.
+        """
+        assert self.is_leaf(node)
+        start = self._allocate(len(moves))
+        end = start + len(moves)
+        self.parent[start:end] = node
+        self.move[start:end] = moves
+        self.first_child[node] = start
+        self.child_count[node] = len(moves)
+
+    def find_child(self, node, move):
+        """ The child of node reached by move, NO_NODE if there is none """
+        children = self.children(node)
+        found = np.nonzero(self.move[children.start:children.stop] == move)[0]
+        if len(found) == 0:
+            return NO_NODE
+        return children.start + int(found[0])
+
+    def update(self, path, leaf_value, visits = 1):
+        """
+        Add leaf_value black wins and visits to all nodes of path, the
+        list of the nodes from the root to a leaf. leaf_value can also be
+        an array with a value for each node.
+        """
+        path = np.asarray(path)
+        self.visits[path] += visits
+        self.black_wins[path] += leaf_value
+
+    def update_amaf(self, path, color, board, leaf_value):
+        """
+        Update the AMAF statistics of the children of the nodes of path,
+        with color to play at the first node of path. board is the board
+        array at the end of the playout: as stones are never removed in
+        gomoku, a move was played after a node if and only if the board
+        has a stone on it, and its color tells who played it.
+        """
+        for node in path:
+            children = self.children(node)
+            if len(children):
+                hits = board[self.move[children.start:children.stop]] == color
+                self.amaf_visits[children.start:children.stop] += hits
+                self.amaf_black_wins[children.start:children.stop] += \
+                    hits * leaf_value
+            color = WHITE + BLACK - color
+
+    def path_to(self, node):
+        """ The nodes from the root to node """
+        path = []
+        while node != NO_NODE:
+            path.append(node)
+            node = int(self.parent[node])
+        return path[::-1]
+
+    def subtree(self, node):
+        """
+        A new tree made of node and its descendants, with node as root.
+        The nodes are copied one depth at a time.
+        """
+        tree = NodeStore(max(1024, int(self.count)))
+        for name in self._copied:
+            getattr(tree, name)[0] = getattr(self, name)[node]
+        old_level = np.array([node])
+        new_level = np.array([NodeStore.ROOT])
+        while len(old_level):
+            counts = self.child_count[old_level]
+            expanded = counts > 0
+            old_level, new_level = old_level[expanded], new_level[expanded]
+            counts = counts[expanded]
+            total = int(counts.sum())
+            if total == 0:
+                break
+            start = tree._allocate(total)
+            offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            tree.first_child[new_level] = start + offsets
+            tree.child_count[new_level] = counts
+            within = np.arange(total) - np.repeat(offsets, counts)
+            old_children = np.repeat(self.first_child[old_level], counts) + \
+                within
+            new_children = np.arange(start, start + total)
+            for name in self._copied:
+                getattr(tree, name)[new_children] = \
+                    getattr(self, name)[old_children]
+            tree.parent[new_children] = np.repeat(new_level, counts)
+            old_level, new_level = old_children, new_children
+        return tree
+
+    def depth_counts(self, max_depth):
+        """
+        The number of expanded nodes at each depth below the root,
+        as a list of max_depth counts.
+        """
+        counts = [0] * max_depth
+        level = np.array([NodeStore.ROOT])
+        depth = 0
+        while len(level) and depth < max_depth:
+            level = level[self.child_count[level] > 0]
+            counts[depth] = len(level)
+            level = np.concatenate([np.arange(first, first + count)
+                                    for first, count in
+                                    zip(self.first_child[level],
+                                        self.child_count[level])] or
+                                   [np.zeros(0, dtype = np.int64)])
+            depth += 1
+        return counts
+
+    def __getstate__(self):
+        """ Pickle only the nodes in use """
+        state = dict(self.__dict__)
+        for name in self._fields:
+            state[name] = state[name][:self.count]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name in self._fields:
+            setattr(self, name, np.array(getattr(self, name)))
+
+
+class SharedNodeStore(NodeStore):
+    """
+    A NodeStore whose arrays and node count are in shared memory, for
+    the processes of a tree parallel search. It is passed to a process
+    when the process is created, the arrays are not copied. The capacity
+    is fixed: the arrays can not grow once the processes share them,
+    the search checks has_room before it expands a node. The processes
+    change the tree only with a common lock held, see MCTS._search.
+    """
+
+    def __init__(self, tree, capacity):
+        """
+        A copy of tree, a NodeStore, with room for capacity nodes.
+        """
+        capacity = max(capacity, tree.count)
+        self._raw = {}
+        for name in self._fields:
+            dtype = getattr(tree, name).dtype
+            self._raw[name] = multiprocessing.RawArray(
+                np.ctypeslib.as_ctypes_type(dtype), capacity)
+        self._raw_count = multiprocessing.RawArray(ctypes.c_int64, 1)
+        self._use_raw()
+        for name in self._fields:
+            getattr(self, name)[:tree.count] = getattr(tree, name)[:tree.count]
+        self.parent[tree.count:] = NO_NODE
+        self.count = tree.count
+
+    def _use_raw(self):
+        """ Point the arrays to the shared memory """
+        for name, raw in self._raw.items():
+            setattr(self, name, np.ctypeslib.as_array(raw))
+        self._count = np.ctypeslib.as_array(self._raw_count)
+
+    @property
+    def count(self):
+        return int(self._count[0])
+
+    @count.setter
+    def count(self, count):
+        self._count[0] = count
+
+    def has_room(self, count):
+        return self.count + count <= len(self.visits)
+
+    def _allocate(self, count):
+        assert self.has_room(count)
+        start = self.count
+        self.count = start + count
+        return start
+
+    def __getstate__(self):
+        """ Only the shared memory, when a process is created """
+        return dict(_raw = self._raw, _raw_count = self._raw_count)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._use_raw()
@@ -0,0 +1,164 @@
+#!/usr/local/bin/python3
+#/usr/bin/python3
+# Set the path to your python3 above
+
+"""
+pattern_compiler.py
+
+Compiles a pattern file (see patterns.txt) into the lookup tables of the
+pattern engine of SimpleGoBoard, and caches the tables on disk.
+
+Patterns are matched on windows of WINDOW points. A window is encoded
+as a base-4 number whose digit k is the color of the k-th point of the
+window: EMPTY 0, BLACK 1, WHITE 2, BORDER 3. A pattern of length L
+matches every window code whose L lowest digits spell the pattern.
+The tables are indexed by window code and by the player to move,
+color - 1:
+counts[code, color - 1, category, k]: how many patterns of the category
+    found in the window have the k-th point of the window as a response
+scores[code, color - 1, k]: the total score those patterns give to the
+    k-th point of the window
+
+Run as: python3 pattern_compiler.py [pattern file]
+to compile the tables and print what is in them.
+"""
+
+import hashlib
+import itertools
+import os
+import sys
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, BORDER
+
+WINDOW = 7
+CODE_WEIGHTS = 4 ** np.arange(WINDOW)
+
+"""
+Bump when the layout of the compiled tables changes,
+so the tables cached by older versions are not used.
+"""
+FORMAT_VERSION = 1
+
+_char_classes = {'X': 'xB', 'O': 'oB'}
+_swapped = str.maketrans('xo', 'ox')
+
+class PatternError(ValueError):
+    pass
+
+def _expand(pattern, responses):
+    """
+    All concrete patterns described by pattern, with their responses:
+    every choice of the character classes, and the mirror images.
+    """
+    choices = [_char_classes.get(c, c) for c in pattern]
+    last = len(pattern) - 1
+    for chars in itertools.product(*choices):
+        concrete = ''.join(chars)
+        yield concrete, set(responses)
+        yield concrete[::-1], set(last - k for k in responses)
+
+def parse_patterns(text):
+    """
+    Read the pattern file text.
+    Returns (names, scores, patterns): the category names, their scores
+    and for each category a dict from concrete pattern to its responses.
+    """
+    names, scores, patterns, swaps = [], [], [], []
+    for number, line in enumerate(text.splitlines(), 1):
+        fields = line.split('#')[0].split()
+        if not fields:
+            continue
+        try:
+            if fields[0] == 'category':
+                name, score = fields[1:]
+                names.append(name)
+                scores.append(int(score))
+                patterns.append({})
+            elif fields[0] == 'swap':
+                source, target = fields[1:]
+                swaps.append((names.index(source), names.index(target)))
+            else:
+                category = names.index(fields[0])
+                pattern = fields[1]
+                responses = [int(k) for k in fields[2:]]
+                if not 1 <= len(pattern) <= WINDOW or \
+                        set(pattern) - set('xo.BXO'):
+                    raise PatternError("bad pattern {}".format(pattern))
+                if not responses or any(not 0 <= k < len(pattern) or
+                                        pattern[k] != '.' for k in responses):
+                    raise PatternError("responses must be empty points")
+                for concrete, offsets in _expand(pattern, responses):
+                    patterns[category].setdefault(concrete, set()).update(
+                        offsets)
+        except (ValueError, IndexError) as e:
+            raise PatternError("line {}: {}: {}".format(number, line, e))
+    for source, target in swaps:
+        for pattern, offsets in list(patterns[source].items()):
+            patterns[target].setdefault(pattern.translate(_swapped),
+                                        set()).update(offsets)
+    return names, scores, patterns
+
+def compile_patterns(scores, patterns):
+    """
+    Build the counts and scores tables, see the module documentation.
+    """
+    counts = np.zeros((4 ** WINDOW, 2, len(patterns), WINDOW), dtype = np.int8)
+    for color in (BLACK, WHITE):
+        digit = {'.': EMPTY, 'x': color, 'o': WHITE + BLACK - color,
+                 'B': BORDER}
+        for category, responses in enumerate(patterns):
+            for pattern, offsets in responses.items():
+                length = len(pattern)
+                code = sum(digit[c] * 4 ** k for k, c in enumerate(pattern))
+                codes = code + 4 ** length * np.arange(4 ** (WINDOW - length))
+                for k in offsets:
+                    counts[codes, color - 1, category, k] += 1
+    code_scores = np.einsum('cvpk,p->cvk', counts.astype(np.int64),
+                            np.array(scores, dtype = np.int64))
+    return counts, code_scores
+
+def _save(path, table):
+    """ Write the table atomically, other processes may be loading it """
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        np.save(f, table)
+    os.replace(temporary, path)
+
+def load_patterns(path):
+    """
+    Compile the pattern file at path, or load its tables compiled before.
+    The tables are cached in the __pycache__ directory next to the file,
+    under the hash of its contents, and are memory-mapped when loaded.
+    Returns (names, scores, counts, code_scores).
+    """
+    with open(path) as f:
+        text = f.read()
+    names, scores, patterns = parse_patterns(text)
+    key = hashlib.sha1("{} {}\n{}".format(FORMAT_VERSION, WINDOW, text)
+                       .encode()).hexdigest()[:16]
+    cache = os.path.join(os.path.dirname(os.path.abspath(path)),
+                         '__pycache__',
+                         "{}.{}".format(os.path.basename(path), key))
+    try:
+        counts = np.asarray(np.load(cache + '.counts.npy', mmap_mode = 'r'))
+        code_scores = np.asarray(np.load(cache + '.scores.npy',
+                                         mmap_mode = 'r'))
+    except (OSError, ValueError):
+        counts, code_scores = compile_patterns(scores, patterns)
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok = True)
+            _save(cache + '.counts.npy', counts)
+            _save(cache + '.scores.npy', code_scores)
+        except OSError:
+            pass
+    return names, scores, counts, code_scores
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patterns.txt')
+    names, scores, counts, code_scores = load_patterns(path)
+    _, _, patterns = parse_patterns(open(path).read())
+    for name, score, responses in zip(names, scores, patterns):
+        print("{:<20} {:>8} {:>4} patterns".format(name, score,
+                                                   len(responses)))
+    print("tables: {} and {} bytes".format(counts.nbytes, code_scores.nbytes))
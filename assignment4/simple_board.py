@@ -9,12 +9,42 @@ Implements a basic Go board with functions to:
 The board uses a 1-dimensional representation with padding
 """
 
+import os
 import numpy as np
+from pattern_compiler import WINDOW, CODE_WEIGHTS, load_patterns
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
-                       MAXSIZE, NULLPOINT
-import alphabeta
-point_list = [[200]]
+                       MAXSIZE, NULLPOINT, zobrist_keys
+
+"""
+Gomoku patterns of get_pattern_moves, compiled from patterns.txt,
+see pattern_compiler.py for the tables.
+"""
+PATTERN_CATEGORIES, PATTERN_SCORES, _code_counts, _code_scores = \
+    load_patterns(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'patterns.txt'))
+
+"""
+Threat patterns of threat_moves, compiled from threats.txt.
+THREAT_CATEGORIES are the move types of the rule based policy,
+the most urgent first.
+"""
+THREAT_CATEGORIES, _, _threat_counts, _ = \
+    load_patterns(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'threats.txt'))
+RANDOM = 'Random'
+
+"""
+Tables that only depend on the board size: the empty board array,
+the neighbors of each point, the initial score of each point,
+the Zobrist hash keys and the points of the pattern windows.
+They are computed once per size and shared by all boards of that size,
+so they must never be modified.
+"""
+_tables_of_size = {}
+_table_attributes = ('neighbors', '_base_score', '_zobrist',
+                     '_white_to_play_key', '_window_points',
+                     '_windows_through')
 
 class SimpleGoBoard(object):
 
@@ -83,64 +113,160 @@ class SimpleGoBoard(object):
         self.WE = 1
         self.ko_recapture = None
         self.current_player = BLACK
+        self.winner = None
+        self._winning_point = None
+        self.move_history = []
         self.maxpoint = size * size + 3 * (size + 1)
-        self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+        if size not in _tables_of_size:
+            self.board = np.full(self.maxpoint, BORDER, dtype = np.int32)
+            self._initialize_empty_points(self.board)
+            self._initialize_neighbors()
+            window_points = self._initial_windows()
+            _tables_of_size[size] = (self.board, self.neighbors,
+                                     self._initial_scores(),
+                                     zobrist_keys(self.maxpoint),
+                                     window_points,
+                                     self._initial_windows_through())
+        empty_board = self._use_tables()
+        self._stone_hash = 0
+        self.board = np.copy(empty_board)
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
-        self._initialize_empty_points(self.board)
-        self._initialize_neighbors()
-        self.score_black = [-1, -1, -1, -1, -1, -1, -1, -1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 3, 4, 3, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, -1, -1, -1, -1, -1, -1, -1, -1]
-        self.score_white = [-1, -1, -1, -1, -1, -1, -1, -1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 3, 4, 3, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, -1, -1, -1, -1, -1, -1, -1, -1]
+        self._initialize_score_board()
+
+    def _use_tables(self):
+        """
+        Point the board to the tables of its size, return the empty board.
+        """
+        empty_board, self.neighbors, self._base_score, \
+            (self._zobrist, self._white_to_play_key), \
+            self._window_points, self._windows_through = \
+            _tables_of_size[self.size]
+        return empty_board
+
+    def __getstate__(self):
+        """
+        Pickle only the state of the game, the tables of the size
+        are shared and are looked up again when unpickled.
+        """
+        state = dict(self.__dict__)
+        for name in _table_attributes:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        if state['size'] not in _tables_of_size:
+            SimpleGoBoard(state['size'])
+        self.__dict__.update(state)
+        self._use_tables()
+
+    def _initial_scores(self):
+        """
+        Score of each point before any pattern is found: the distance
+        to the edge of the board, -1 on the BORDER.
+        """
+        score = np.full(self.maxpoint, -1, dtype = np.int64)
+        for row in range(1, self.size + 1):
+            for col in range(1, self.size + 1):
+                score[self.pt(row, col)] = min(row, col, self.size + 1 - row,
+                                               self.size + 1 - col)
+        score.flags.writeable = False
+        return score
+
+    def _initial_windows(self):
+        """
+        The points of the windows of WINDOW points that start at every
+        point of the board array, for each of the four directions.
+        Points past the end of the array are replaced by point 0,
+        which is on the BORDER like the points they stand for.
+        """
+        starts = np.arange(self.maxpoint)
+        windows = [starts[:, None] + shift * np.arange(WINDOW)
+                   for shift in [1, self.NS, self.NS + 1, self.NS - 1]]
+        windows = np.concatenate(windows)
+        windows[windows >= self.maxpoint] = 0
+        return windows
+
+    def _initial_windows_through(self):
+        """
+        For each point, the array of the numbers of the windows of
+        _initial_windows that contain it.
+        """
+        shifts = [1, self.NS, self.NS + 1, self.NS - 1]
+        windows_through = []
+        for point in range(self.maxpoint):
+            windows = [direction * self.maxpoint + point - k * shift
+                       for direction, shift in enumerate(shifts)
+                       for k in range(WINDOW) if point - k * shift >= 0]
+            windows_through.append(np.array(windows))
+        return tuple(windows_through)
 
     def _initialize_score_board(self):
-        self.score_black = [-1, -1, -1, -1, -1, -1, -1, -1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 3, 4, 3, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, -1, -1, -1, -1, -1, -1, -1, -1]
-        self.score_white = [-1, -1, -1, -1, -1, -1, -1, -1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 3, 4, 3, 2, 1,
-                            -1, 1, 2, 3, 3, 3, 2, 1,
-                            -1, 1, 2, 2, 2, 2, 2, 1,
-                            -1, 1, 1, 1, 1, 1, 1, 1,
-                            -1, -1, -1, -1, -1, -1, -1, -1, -1]
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-        non = np.append(white_points, black_points)
-        for i in non:
-            self.score_black[i] = -2000000
-            self.score_white[i] = -2000000
+        """
+        Compute the window codes and the move scores of both colors
+        from scratch. After that, _update_score_board keeps them up to
+        date with the points changed by play_move_gomoku and undo.
+        score_black and score_white are the base score of each point,
+        -2000000 on stones, plus the pattern scores of that player.
+        """
+        self._codes = self._window_codes(self._window_points)
+        self._point_base = np.array(self._base_score)
+        self._point_base[self.board == BLACK] = -2000000
+        self._point_base[self.board == WHITE] = -2000000
+        self._scores = np.stack([self._point_base + self.pattern_scores(BLACK),
+                                 self._point_base + self.pattern_scores(WHITE)])
+        self._changed_points = []
+
+    @property
+    def score_black(self):
+        return self._scores[0]
+
+    @property
+    def score_white(self):
+        return self._scores[1]
+
+    def _update_score_board(self):
+        """
+        Bring the window codes and the scores up to date with the points
+        changed since the last update. Only the windows through those
+        points are encoded and scored again.
+        """
+        if not self._changed_points:
+            return
+        points = list(set(self._changed_points))
+        self._changed_points = []
+        if len(points) == 1:
+            windows = self._windows_through[points[0]]
+        else:
+            windows = np.unique(np.concatenate(
+                [self._windows_through[p] for p in points]))
+        window_points = self._window_points[windows]
+        new_codes = self._window_codes(window_points)
+        change = _code_scores[new_codes] - _code_scores[self._codes[windows]]
+        self._codes[windows] = new_codes
+        # one bincount for both players, the scores of WHITE come second
+        targets = window_points[:, None, :] + np.array([[0], [self.maxpoint]])
+        self._scores += np.bincount(targets.ravel(), weights = change.ravel(),
+                                    minlength = 2 * self.maxpoint
+                                    ).astype(np.int64).reshape(2, -1)
+        base = np.where(self.board[points] == EMPTY,
+                        self._base_score[points], -2000000)
+        self._scores[:, points] += base - self._point_base[points]
+        self._point_base[points] = base
 
     def copy(self):
-        b = SimpleGoBoard(self.size)
-        assert b.NS == self.NS
-        assert b.WE == self.WE
-        b.ko_recapture = self.ko_recapture
-        b.current_player = self.current_player
-        assert b.maxpoint == self.maxpoint
+        """
+        Copy the board. The size-dependent tables are shared,
+        only the mutable state is duplicated.
+        """
+        b = SimpleGoBoard.__new__(SimpleGoBoard)
+        b.__dict__.update(self.__dict__)
         b.board = np.copy(self.board)
+        b.liberty_of = np.copy(self.liberty_of)
+        b._scores = np.copy(self._scores)
+        b._codes = np.copy(self._codes)
+        b._point_base = np.copy(self._point_base)
+        b._changed_points = list(self._changed_points)
+        b.move_history = list(self.move_history)
         return b
 
     def row_start(self, row):
@@ -287,7 +413,11 @@ class SimpleGoBoard(object):
         if self._has_liberty(opp_block):
             return None
         captures = list(where1d(opp_block))
+        opp_keys = self._zobrist[self.board[nb_point]]
+        for stone in captures:
+            self._stone_hash ^= opp_keys[stone]
         self.board[captures] = EMPTY
+        self._changed_points.extend(captures)
         self.liberty_of[captures] = NULLPOINT
         single_capture = None
         if len(captures) == 1:
@@ -314,6 +444,8 @@ class SimpleGoBoard(object):
         opp_color = GoBoardUtil.opponent(color)
         in_enemy_eye = self._is_surrounded(point, opp_color)
         self.board[point] = color
+        self._stone_hash ^= self._zobrist[color][point]
+        self._changed_points.append(point)
         single_captures = []
         neighbors = self.neighbors[point]
         for nb in neighbors:
@@ -326,6 +458,7 @@ class SimpleGoBoard(object):
             block = self._block_of(point)
             if not self._has_liberty(block): # undo suicide move
                 self.board[point] = EMPTY
+                self._stone_hash ^= self._zobrist[color][point]
                 return False
         self.ko_recapture = None
         if in_enemy_eye and len(single_captures) == 1:
@@ -393,11 +526,65 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
-        #self.score_black[point] = -2000000
-        #self.score_white[point] = -2000000
+        self._stone_hash ^= self._zobrist[color][point]
+        self._changed_points.append(point)
         self.current_player = GoBoardUtil.opponent(color)
+        # only the four lines through the new stone can complete a five
+        if self.winner is None and self.point_check_game_end_gomoku(point):
+            self.winner = color
+            self._winning_point = point
         return True
 
+    def hash(self):
+        """
+        64-bit Zobrist hash of the position, including the player to move.
+        The stones are hashed incrementally as they are played and taken back.
+        """
+        if self.current_player == WHITE:
+            return self._stone_hash ^ self._white_to_play_key
+        return self._stone_hash
+
+    def undo(self, point):
+        """
+            Take back the stone on point, for the game of gomoku.
+            The stone's owner becomes the player to move again.
+            """
+        color = self.board[point]
+        assert is_black_white(color)
+        self.board[point] = EMPTY
+        self._stone_hash ^= self._zobrist[color][point]
+        self._changed_points.append(point)
+        self.current_player = color
+        if point == self._winning_point:
+            self.winner = None
+            self._winning_point = None
+
+    def push_move(self, point, color):
+        """
+            Play a gomoku move or a pass of color and remember it,
+            so it can be taken back by pop_move.
+            Returns boolean: whether move was legal
+            """
+        previous_player = self.current_player
+        if point == PASS:
+            self.current_player = GoBoardUtil.opponent(color)
+        elif not self.play_move_gomoku(point, color):
+            return False
+        self.move_history.append((point, previous_player))
+        return True
+
+    def pop_move(self):
+        """
+            Take back the last move played by push_move and
+            restore the state from before that move.
+            Returns the move.
+            """
+        point, previous_player = self.move_history.pop()
+        if point != PASS:
+            self.undo(point)
+        self.current_player = previous_player
+        return point
+
     def _point_direction_check_connect_gomoko(self, point, shift):
         """
         Check if the point has connect5 condition in a direction
@@ -415,6 +602,8 @@ class SimpleGoBoard(object):
                     break
             else:
                 break
+        if count == 5:
+            return True
         d = -d
         p = point
         while True:
@@ -453,21 +642,15 @@ class SimpleGoBoard(object):
     def check_game_end_gomoku(self):
         """
             Check if the game ends for the game of Gomoku.
+            The winner is tracked by play_move_gomoku and undo,
+            so this does not need to scan the board.
             """
-        white_points = where1d(self.board == WHITE)
-        black_points = where1d(self.board == BLACK)
-
-        for point in white_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, WHITE
-
-        for point in black_points:
-            if self.point_check_game_end_gomoku(point):
-                return True, BLACK
-
+        if self.winner is not None:
+            return True, self.winner
         return False, None
 
     def solve(self):
+        import alphabeta
         result, move, drawMove = alphabeta.solve(self)
         if move=="First":
             if result==0:
@@ -485,157 +668,126 @@ class SimpleGoBoard(object):
             winner='w' if self.current_player==WHITE else 'b'
             return winner, move
 
-    def check_pattern(self,point,have,new,direction_x,direction_y,moveSet,patternList,color,flag):
-
-        for i in range(len(patternList)):
-            if have in patternList[i]:
-                #print(point_list)
-                for j in point_list:
-                    token = 0
-                    for w in new:
-                        if w in j:
-                            toekn += 1
-                    #print(1)
-                    if token < len(new):
-                        #print(2)
-
-                        for dis in patternList[i][have]:
-                            #moveSet[i].add(point-direction_x*(dis+1)-direction_y*self.NS*(dis+1))
-                            moveSet[i].append(point-direction_x*(dis+1)-direction_y*self.NS*(dis+1))
-                        #flag[0]=True
-                        #print(moveSet)
-                        point_list.append(new)
-                        break
-        if (not (0<= point<len(self.board))) or len(have)==9:
-            return
-        #if self.get_color(point)==BORDER or len(have)==7:
-        #            return
-        piece=self.get_color(point)
-
-        if piece==EMPTY:
-            piece='.'
-        elif piece==color:
-            piece='x'
-        elif piece == BORDER:
-            piece='B'
-        else:
-            piece='o'
-
-        have+=piece
-        new.append(point)
-        #print(GoBoardUtil.format_point(self._point_to_coord(point)),have,self.board[point])
-        self.check_pattern(point+direction_x+direction_y*self.NS,have,new,direction_x,direction_y,moveSet,patternList,color,flag)
-
     def get_pattern_moves(self):
         """
         1. direct winning point xxxx. x.xxx xx.xx
         2. urgent blocking point xoooo.
         3. wining in 2 step point
+        Returns the points with the best score for the player to move
+        and that score, see patterns.txt and pattern_scores.
         """
         if len(self.get_empty_points())==0:
             return [None],None
-        self._initialize_score_board()
-        moveSet=[[], [], [], [], [], [], [], [], [], [], []]
-        #moveSet=[set(),set(),set(),set(),set(),set(),set(),set()]
-        SL = [1000000, 900000, 500000, 200000, 90000, 40000, 25000, 10000, 4500, 2000, 500]
         color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win - 1 000 000
-                     {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win - 900 000
-                     {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-open-four - 500 000
-                     {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6}, 'x.ooo..':{0}, '..ooo.x':{6}}, #block-open-four - 200 000
-                     {'Bxxx..':{0,1}, 'oxxx..':{0,1}, '..xxxB':{0,1}, '..xxxo':{0,1}, 'Bxx.x.':{0,2}, '.xx.xB':{2,5}, 'oxx.x.':{0,2}, '.xx.xo':{2,5},'ox.xx.':{0,3}, '.x.xxo':{3,5}, 'Bx.xx.':{0,3}, '.x.xxB':{3,5}}, #make-dead-four - 90 000
-                     {'..xx...':{2}, '...xx..':{4}, '..x.x..':{3}}, #make-super-open-three - 40 000
-                     {'o.xx...':{2},'B.xx...':{2}, '...xx.o':{4}, '...xx.B':{4}, 'o.x.x..':{3}, 'B.x.x..':{3}, '..x.x.o':{3}, '..x.x.B':{3}}, #make-low-open-three - 25 000
-                     {'..oo.':{0,3}, '.oo..':{1,4}, '.o.o.':{0,2,4}, '..oo.x':{5}, 'x.oo..': {0}, '..oo.B':{5}, 'B.oo..': {0}}, #block_open_three - 10 000
-                     {'.x...':{1,2}, '..x..':{1,3}, '...x.':{2,3}}, #make-open-two - 4500
-                     {'oxx...':{1,2}, 'Bxx...':{1,2}, '...xxo':{3,4}, '...xxB':{3,4}, 'o.xx..o':{2}, 'o..xx.o':{4}, 'o.x.x.o':{3}}, #make-dead-three - 2000
-                     {'ox....':{3}, 'Bx....':{3}, '....xo':{2}, '....xB':{2}} #make-dead-two - 500
-                     ]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in range(0, len(self.board)):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                self.check_pattern(point,'',[],direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
-        #print(point_list)
-        point_list = [[200]]
-
-        '''
-        for i in range(len(moveSet)):
-            moveSet[i] = list(set(moveSet[i]))
-        '''
-
-        for i in range(len(moveSet)):
-            for j in range(len(moveSet[i])):
-                #print(moveSet[i][j], SL[i])
-                if color == WHITE:
-                    self.score_white[moveSet[i][j]] += SL[i]
-                elif color == BLACK:
-                    self.score_black[moveSet[i][j]] += SL[i]
-
-        best_score = 0
-        best_score_moves = []
-        for i in range(len(self.score_black)):
-            if color == 2:
-                if self.score_white[i] > best_score:
-                    best_score = self.score_white[i]
-                    best_score_moves.clear()
-                    best_score_moves.append(i)
-                elif self.score_white[i] == best_score:
-                    best_score_moves.append(i)
-            if color == 1:
-                if self.score_black[i] > best_score:
-                    best_score = self.score_black[i]
-                    best_score_moves.clear()
-                    best_score_moves.append(i)
-                elif self.score_black[i] == best_score:
-                    best_score_moves.append(i)
-        return best_score_moves,best_score
-    '''       
-    print(moveSet)
-    print(self.score_black)
-    print(self.score_white)
-    '''
-    '''
-    i=0
-    while i<4 and not bool(moveSet[i]): i+=1
-    if i==4:
-        return None
-    else:
-        #return i, list(moveSet[i])
-        return i, moveSet[i]
-    '''
+        self._update_score_board()
+        scores = self.score_white if color == WHITE else self.score_black
+        best_score = scores.max()
+        best_score_moves = where1d(scores == best_score).tolist()
+        return best_score_moves,int(best_score)
+
+    def _window_codes(self, window_points):
+        """
+        Base-4 codes of the windows with the given points.
+        Digit k of a code is the color of the k-th point of the window:
+        0 empty, 1 black, 2 white, 3 border.
+        """
+        return self.board[window_points] @ CODE_WEIGHTS
+
+    def pattern_scores(self, color):
+        """
+        The total score of the patterns found for color at each point,
+        an array indexed by point. A point gets PATTERN_SCORES[i] each
+        time it is a response of a pattern of category i.
+        Computed from scratch, without the maintained window codes.
+        """
+        codes = self._window_codes(self._window_points)
+        return np.bincount(self._window_points.ravel(),
+                           weights = _code_scores[codes, color - 1].ravel(),
+                           minlength = self.maxpoint).astype(np.int64)
+
+    def pattern_move_sets(self, color):
+        """
+        For each category of patterns.txt, the responses of all patterns
+        of that category found for color. A point is listed once
+        for every pattern found.
+        """
+        self._update_score_board()
+        hits = _code_counts[self._codes, color - 1]
+        move_sets = []
+        for category in range(len(PATTERN_SCORES)):
+            window, offset = np.nonzero(hits[:, category, :])
+            points = self._window_points[window, offset]
+            move_sets.append(np.repeat(points, hits[window, category, offset])
+                             .tolist())
+        return move_sets
+
+    def threat_moves(self, color = None):
+        """
+        The moves of the rule based policy for color, by default the
+        player to move: the first category of THREAT_CATEGORIES with
+        a response on the board, and its responses as a sorted list.
+        Returns (RANDOM, all empty points) when there is no threat.
+        """
+        if color is None:
+            color = self.current_player
+        self._update_score_board()
+        hits = _threat_counts[self._codes, color - 1]
+        window, category, offset = np.nonzero(hits)
+        if len(category) == 0:
+            return RANDOM, self.get_empty_points().tolist()
+        first = category == category.min()
+        points = self._window_points[window[first], offset[first]]
+        return THREAT_CATEGORIES[category.min()], np.unique(points).tolist()
 
     def list_solve_point(self):
         """
-        1. direct winning point xxxx. x.xxx xx.xx
-        2. urgent blocking point xoooo.
-        3. wining in 2 step point
+        The threat moves of the player to move, see threat_moves,
+        or None when there is no threat.
         """
-        moveSet=[set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},{'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},{'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},{'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in where1d(self.board!=BORDER):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
-
-        i=0
-        while i<4 and not bool(moveSet[i]):
-            i+=1
-        if i==4:
+        category, moves = self.threat_moves()
+        if category == RANDOM:
             return None
-        else:
-            return list(moveSet[i])
+        return moves
+
+    def forced_moves(self, color = None):
+        """
+        The moves of color, by default the player to move, that need no
+        search. Returns (move, moves):
+        move is a forced move, or None if there is none:
+            a move that makes five,
+            a block of a four of the opponent, there is nothing else
+            to do: with more than one, the game is lost anyway,
+            a move that makes an open four or two fours,
+            a four-three: a move that makes a four, after whose forced
+            block color can make five or an open four.
+        moves are the moves that do not lose at once, the root moves
+        of the search: the moves of the threat if there is one, and
+        the moves that make a four when the opponent threatens to make
+        an open four. Otherwise all empty points. Passing is left out,
+        in gomoku a stone never hurts its player.
+        """
+        if color is None:
+            color = self.current_player
+        opponent = GoBoardUtil.opponent(color)
+        category, moves = self.threat_moves(color)
+        if category in ('Win', 'BlockWin', 'OpenFour'):
+            return moves[0], moves
+        empty_points = self.get_empty_points().tolist()
+        fours = []
+        for move in empty_points:
+            self.push_move(move, color)
+            after, wins = self.threat_moves(color)
+            sure_win = False
+            if after == 'Win':
+                fours.append(move)
+                sure_win = len(wins) > 1
+                if not sure_win:
+                    self.push_move(wins[0], opponent)
+                    sure_win = self.threat_moves(color)[0] in ('Win', 'OpenFour')
+                    self.pop_move()
+            self.pop_move()
+            if sure_win:
+                return move, [move]
+        if category == 'BlockOpenFour':
+            return None, sorted(set(moves) | set(fours))
+        return None, empty_points
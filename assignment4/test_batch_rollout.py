@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import random
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY
+from simple_board import SimpleGoBoard
+from batch_rollout import BatchRollout
+from GomokuMCTS import MCTS
+
+class BatchRolloutTestCase(unittest.TestCase):
+    """Tests for batch_rollout.py"""
+
+    def random_board(self, rng, moves, size = 7):
+        goboard = SimpleGoBoard(size)
+        for _ in range(moves):
+            empty = list(goboard.get_empty_points())
+            if goboard.winner is not None or not empty:
+                break
+            goboard.play_move_gomoku(rng.choice(empty), goboard.current_player)
+        return goboard
+
+    def test_pattern_policy_plays_like_get_pattern_moves(self):
+        rng = random.Random(5)
+        rollout = BatchRollout(7)
+        goboards = [self.random_board(rng, rng.randrange(12))
+                    for _ in range(20)]
+        boards = np.array([goboard.board for goboard in goboards])
+        winners = rollout.run(boards, [g.current_player for g in goboards])
+        for goboard, board, winner in zip(goboards, boards, winners):
+            while goboard.winner is None and len(goboard.get_empty_points()):
+                goboard.play_move_gomoku(goboard.get_pattern_moves()[0][0],
+                                         goboard.current_player)
+            self.assertEqual(winner, goboard.winner or EMPTY)
+            self.assertEqual(list(board), list(goboard.board))
+
+    def test_games_end_with_five_or_a_full_board(self):
+        rollout = BatchRollout(7)
+        rng = np.random.default_rng(1)
+        for policy in ["random", "rule_based"]:
+            boards = np.tile(SimpleGoBoard(7).board, (50, 1))
+            winners = rollout.run(boards, np.full(50, BLACK), policy, rng)
+            for board, winner in zip(boards, winners):
+                goboard = SimpleGoBoard(7)
+                goboard.board = board
+                stones = [point for point in range(goboard.maxpoint)
+                          if board[point] in (BLACK, WHITE)]
+                five = {color for color in (BLACK, WHITE)
+                        if any(board[p] == color and
+                               goboard.point_check_game_end_gomoku(p)
+                               for p in stones)}
+                if winner == EMPTY:
+                    self.assertEqual(five, set())
+                    self.assertFalse((board == EMPTY).any())
+                else:
+                    self.assertEqual(five, {winner})
+
+    def test_rule_based_takes_the_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in [1, 2, 3, 4]:
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(6, col), WHITE)
+        boards = np.tile(goboard.board, (20, 1))
+        winners = BatchRollout(7).run(boards, np.full(20, BLACK), "rule_based")
+        self.assertEqual(list(winners), [BLACK] * 20)
+        self.assertTrue((boards[:, goboard.pt(2, 5)] == BLACK).all())
+
+    def test_finished_games_are_not_played(self):
+        goboard = SimpleGoBoard(7)
+        for col in [1, 2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(3, col), WHITE)
+        boards = np.array([goboard.board])
+        self.assertEqual(list(BatchRollout(7).run(boards, [BLACK])), [WHITE])
+        self.assertEqual(list(boards[0]), list(goboard.board))
+
+    def test_batched_search_visits(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 98 * 3, exploration = 0.4,
+                             simulation_policy = "rule_based", batch_size = 32,
+                             root_moves = goboard.get_empty_points().tolist())
+        self.assertIn(move, list(goboard.get_empty_points()))
+        tree = mcts.tree
+        children = tree.children(tree.ROOT)
+        visits = tree.visits[children.start:children.stop].sum()
+        self.assertEqual(visits, tree.visits[tree.ROOT])
+        self.assertEqual(tree.visits[tree.ROOT], 98 * 3)
+        self.assertTrue(0 <= tree.black_wins[tree.ROOT] <= 98 * 3)
+        self.assertEqual(goboard.move_history, [])
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
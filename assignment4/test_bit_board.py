@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import pickle
+import random
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, BORDER, GoBoardUtil
+from simple_board import SimpleGoBoard
+from bit_board import BitGoBoard
+
+class BitGoBoardTestCase(unittest.TestCase):
+    """Tests for bit_board.py, checked against simple_board.py"""
+
+    def test_empty_points(self):
+        goboard = BitGoBoard(7)
+        self.assertIsInstance(goboard.get_empty_points(), np.ndarray)
+        self.assertEqual(goboard.get_empty_points().tolist(),
+                         SimpleGoBoard(7).get_empty_points().tolist())
+
+    def test_board_array(self):
+        goboard = BitGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(1, 1), BLACK)
+        goboard.play_move_gomoku(goboard.pt(7, 7), WHITE)
+        self.assertEqual(goboard.get_color(0), BORDER)
+        self.assertEqual(goboard.get_color(goboard.pt(1, 1)), BLACK)
+        self.assertEqual(goboard.get_color(goboard.pt(7, 7)), WHITE)
+        self.assertEqual(goboard.get_color(goboard.pt(4, 4)), EMPTY)
+        self.assertEqual(GoBoardUtil.get_twoD_board(goboard)[6, 6], WHITE)
+
+    def test_no_wrap_around_rows(self):
+        goboard = BitGoBoard(7)
+        for col in [5, 6, 7]:
+            goboard.play_move_gomoku(goboard.pt(1, col), BLACK)
+        for col in [1, 2]:
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+
+    def test_copy_is_independent(self):
+        goboard = BitGoBoard(7)
+        board_copy = goboard.copy()
+        board_copy.play_move_gomoku(goboard.pt(2, 2), BLACK)
+        self.assertEqual(goboard.get_color(goboard.pt(2, 2)), EMPTY)
+        self.assertEqual(goboard.current_player, BLACK)
+
+    def test_pickle_shares_masks(self):
+        goboard = BitGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(2, 2), BLACK)
+        loaded = pickle.loads(pickle.dumps(goboard))
+        self.assertIs(loaded._lines, goboard._lines)
+        self.assertEqual(loaded.hash(), goboard.hash())
+        self.assertEqual(list(loaded.board), list(goboard.board))
+        self.assertEqual(loaded.current_player, WHITE)
+
+    def test_push_pop_restores_state(self):
+        goboard = BitGoBoard(7)
+        for col in [1, 2, 3, 4]:
+            goboard.push_move(goboard.pt(3, col), BLACK)
+            goboard.push_move(goboard.pt(4, col), WHITE)
+        goboard.push_move(goboard.pt(3, 5), BLACK)
+        self.assertEqual(goboard.check_game_end_gomoku(), (True, BLACK))
+        while goboard.move_history:
+            goboard.pop_move()
+        self.assertEqual(goboard.get_empty_points().tolist(),
+                         BitGoBoard(7).get_empty_points().tolist())
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+        self.assertEqual(goboard.current_player, BLACK)
+
+    def test_random_games_match_simple_board(self):
+        rng = random.Random(496)
+        for size in [5, 7, 9]:
+            for _ in range(30):
+                simple = SimpleGoBoard(size)
+                bits = BitGoBoard(size)
+                moves = list(simple.get_empty_points())
+                rng.shuffle(moves)
+                for move in moves:
+                    color = simple.current_player
+                    simple.play_move_gomoku(move, color)
+                    bits.play_move_gomoku(move, color)
+                    self.assertEqual(bits.point_check_game_end_gomoku(move),
+                                     simple.point_check_game_end_gomoku(move))
+                    self.assertEqual(bits.check_game_end_gomoku(),
+                                     simple.check_game_end_gomoku())
+                    self.assertEqual(bits.hash(), simple.hash())
+                    self.assertEqual(bits.get_empty_points().tolist(),
+                                     simple.get_empty_points().tolist())
+                self.assertEqual(list(bits.board), list(simple.board))
+
+    def test_pattern_moves_follow_play_and_undo(self):
+        rng = random.Random(7)
+        simple = SimpleGoBoard(7)
+        bits = BitGoBoard(7)
+        bits.get_pattern_moves()
+        pattern_board = bits._pattern_board()
+        for _ in range(100):
+            empty = simple.get_empty_points().tolist()
+            if simple.move_history and (not empty or rng.random() < 0.4):
+                simple.pop_move()
+                bits.pop_move()
+            else:
+                move = rng.choice(empty)
+                simple.push_move(move, simple.current_player)
+                bits.push_move(move, bits.current_player)
+            board_copy = bits.copy()
+            self.assertEqual(board_copy.threat_moves(), simple.threat_moves())
+            self.assertEqual(bits.get_pattern_moves(),
+                             simple.get_pattern_moves())
+            self.assertEqual(bits.forced_moves(), simple.forced_moves())
+        self.assertIs(bits._pattern_board(), pattern_board)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
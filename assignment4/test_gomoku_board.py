@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import pickle
+from board_util import BLACK, WHITE, EMPTY
+from simple_board import SimpleGoBoard
+
+class GomokuBoardTestCase(unittest.TestCase):
+    """Tests for the gomoku part of simple_board.py"""
+
+    def play_row(self, goboard, row, cols, color):
+        for col in cols:
+            goboard.play_move_gomoku(goboard.pt(row, col), color)
+
+    def test_empty_board_not_ended(self):
+        goboard = SimpleGoBoard(7)
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+
+    def test_horizontal_five(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 3, [1, 2, 3, 4], BLACK)
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+        goboard.play_move_gomoku(goboard.pt(3, 5), BLACK)
+        self.assertEqual(goboard.check_game_end_gomoku(), (True, BLACK))
+
+    def test_diagonal_five(self):
+        goboard = SimpleGoBoard(7)
+        for i in range(3, 8):
+            goboard.play_move_gomoku(goboard.pt(i, 10 - i), WHITE)
+        self.assertEqual(goboard.check_game_end_gomoku(), (True, WHITE))
+
+    def test_no_wrap_around_rows(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 1, [5, 6, 7], BLACK)
+        self.play_row(goboard, 2, [1, 2], BLACK)
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+
+    def test_undo_reverts_winner(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 4, [2, 3, 4, 5, 6], WHITE)
+        self.assertEqual(goboard.check_game_end_gomoku(), (True, WHITE))
+        goboard.undo(goboard.pt(4, 6))
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+        self.assertEqual(goboard.board[goboard.pt(4, 6)], EMPTY)
+        self.assertEqual(goboard.current_player, WHITE)
+
+    def test_copy_keeps_winner(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 1, [1, 2, 3, 4, 5], BLACK)
+        self.assertEqual(goboard.copy().check_game_end_gomoku(), (True, BLACK))
+
+    def test_copy_is_independent(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(2, 2), BLACK)
+        board_copy = goboard.copy()
+        board_copy.play_move_gomoku(goboard.pt(3, 3), WHITE)
+        self.assertEqual(goboard.board[goboard.pt(3, 3)], EMPTY)
+        self.assertEqual(goboard.current_player, WHITE)
+        self.assertEqual(board_copy.current_player, BLACK)
+        self.assertIs(board_copy.neighbors, goboard.neighbors)
+
+    def test_push_pop_restores_state(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 2, [1, 2, 3, 4], BLACK)
+        before = goboard.copy()
+        self.assertTrue(goboard.push_move(goboard.pt(2, 5), BLACK))
+        self.assertTrue(goboard.push_move(None, WHITE))
+        self.assertFalse(goboard.push_move(goboard.pt(2, 5), BLACK))
+        self.assertEqual(goboard.check_game_end_gomoku(), (True, BLACK))
+        self.assertEqual(goboard.pop_move(), None)
+        self.assertEqual(goboard.pop_move(), goboard.pt(2, 5))
+        self.assertEqual(goboard.move_history, [])
+        self.assertEqual(list(goboard.board), list(before.board))
+        self.assertEqual(goboard.current_player, before.current_player)
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+
+    def test_hash_transpositions(self):
+        a = SimpleGoBoard(7)
+        b = SimpleGoBoard(7)
+        for row, col, color in [(1, 1, BLACK), (2, 2, WHITE), (3, 3, BLACK)]:
+            a.play_move_gomoku(a.pt(row, col), color)
+        for row, col, color in [(3, 3, BLACK), (2, 2, WHITE), (1, 1, BLACK)]:
+            b.play_move_gomoku(b.pt(row, col), color)
+        self.assertEqual(a.hash(), b.hash())
+        self.assertEqual(a.copy().hash(), a.hash())
+        b.push_move(None, WHITE)
+        self.assertNotEqual(a.hash(), b.hash())
+        b.pop_move()
+        self.assertEqual(a.hash(), b.hash())
+
+    def test_hash_restored_by_pop(self):
+        goboard = SimpleGoBoard(7)
+        empty_hash = goboard.hash()
+        for point in list(goboard.get_empty_points())[:10]:
+            goboard.push_move(point, goboard.current_player)
+        self.assertNotEqual(goboard.hash(), empty_hash)
+        while goboard.move_history:
+            goboard.pop_move()
+        self.assertEqual(goboard.hash(), empty_hash)
+
+    def test_reset_after_size_change(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(1, 1), BLACK)
+        goboard.reset(9)
+        self.assertEqual(len(goboard.get_empty_points()), 81)
+        goboard.reset(7)
+        self.assertEqual(len(goboard.get_empty_points()), 49)
+        self.assertEqual(goboard.score_black[goboard.pt(4, 4)], 4)
+
+    def test_pickle_shares_size_tables(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 4, [2, 3, 4, 5], BLACK)
+        loaded = pickle.loads(pickle.dumps(goboard))
+        self.assertIs(loaded._window_points, goboard._window_points)
+        self.assertEqual(loaded.hash(), goboard.hash())
+        self.assertEqual(loaded.get_pattern_moves(), goboard.get_pattern_moves())
+        loaded.play_move_gomoku(goboard.pt(4, 6), BLACK)
+        self.assertEqual(loaded.check_game_end_gomoku(), (True, BLACK))
+        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,381 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import multiprocessing
+import time
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+import numpy as np
+from GomokuMCTS import MCTS, merge_roots, uct_values, rave_values, \
+                       RAVE_EQUIVALENCE, decision_settled
+from node_store import NodeStore, PASS_MOVE
+from Gomoku5 import Gomoku5
+from time_manager import FORCED, CRITICAL
+
+class UCTTestCase(unittest.TestCase):
+    """Tests for the UCT selection of GomokuMCTS.py"""
+
+    def test_values_of_all_children(self):
+        visits = np.array([4, 0, 10, 1])
+        black_wins = np.array([3.0, 0.0, 2.0, 0.5])
+        for max_flag in [True, False]:
+            values = uct_values(15, visits, black_wins, 0.4, max_flag)
+            self.assertEqual(values[1], np.inf)
+            for k in [0, 2, 3]:
+                rate = black_wins[k] / visits[k]
+                if not max_flag:
+                    rate = 1 - rate
+                self.assertAlmostEqual(values[k], rate + 0.4 *
+                                       np.sqrt(np.log(15) / visits[k]))
+
+    def test_log_table_grows(self):
+        visits = np.array([50000, 70000])
+        values = uct_values(120000, visits, np.array([1.0, 2.0]), 1, True)
+        self.assertAlmostEqual(values[0], 1 / 50000 +
+                               np.sqrt(np.log(120000) / 50000))
+
+    def test_rave_values_mix_in_amaf(self):
+        visits = np.array([4, 0, 0])
+        black_wins = np.array([3.0, 0.0, 0.0])
+        amaf_visits = np.array([10, 5, 0])
+        amaf_black_wins = np.array([2.0, 5.0, 0.0])
+        values = rave_values(4, visits, black_wins, amaf_visits,
+                             amaf_black_wins, 0.4, True)
+        beta = np.sqrt(RAVE_EQUIVALENCE / (3 * 4 + RAVE_EQUIVALENCE))
+        self.assertAlmostEqual(values[0], (1 - beta) * 0.75 + beta * 0.2 +
+                               0.4 * np.sqrt(np.log(4) / 4))
+        # unvisited children come first, by their AMAF win rate
+        self.assertGreater(values[1], values[2])
+        self.assertGreater(values[2], values[0])
+        values = rave_values(4, visits, black_wins, amaf_visits,
+                             amaf_black_wins, 0.4, False)
+        self.assertGreater(values[2], values[1])
+
+
+class SearchTestCase(unittest.TestCase):
+    """Tests for the sequential search of GomokuMCTS.py"""
+
+    def test_finished_games_stay_leaves(self):
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(1, col), WHITE)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 98 * 3, exploration = 0.4,
+                             simulation_policy = "random")
+        self.assertIn(move, [goboard.pt(4, 1), goboard.pt(4, 6)])
+        win = mcts.tree.find_child(NodeStore.ROOT, move)
+        self.assertTrue(mcts.tree.is_leaf(win))
+        self.assertEqual(mcts.tree.black_wins[win], mcts.tree.visits[win])
+
+    def test_rave_finds_the_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+        goboard.play_move_gomoku(goboard.pt(4, 1), WHITE)
+        goboard.play_move_gomoku(goboard.pt(1, 1), WHITE)
+        goboard.play_move_gomoku(goboard.pt(1, 2), WHITE)
+        goboard.current_player = BLACK
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 98 * 3, exploration = 0.4,
+                             simulation_policy = "random", rave = True)
+        self.assertEqual(move, goboard.pt(4, 6))
+        tree = mcts.tree
+        children = tree.children(NodeStore.ROOT)
+        amaf_visits = tree.amaf_visits[children.start:children.stop]
+        self.assertGreater(amaf_visits.sum(), tree.visits[NodeStore.ROOT])
+        played = tree.move[children.start:children.stop] != PASS_MOVE
+        self.assertTrue((amaf_visits >= tree.visits[children.start:
+                                                    children.stop])[played].all())
+
+    def test_search_until_the_deadline(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        start = time.time()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = None, exploration = 0.4,
+                             simulation_policy = "random",
+                             deadline = start + 0.3)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertGreater(mcts.tree.visits[NodeStore.ROOT], 0)
+        self.assertEqual(mcts.best_move, move)
+
+    def test_deadline_passed_still_gives_a_move(self):
+        engine = Gomoku5(98 * 3, None, 'random', None)
+        goboard = SimpleGoBoard(7)
+        move = engine.get_move(goboard, BLACK, deadline = time.time() - 1)
+        self.assertIn(move, list(goboard.get_empty_points()))
+        self.assertEqual(engine.best_move, move)
+        # the root is expanded with the moves of forced_moves before
+        # the search, no playout is needed to have a move
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT], 0)
+
+    def test_decision_settled(self):
+        visits = np.array([30, 10, 5])
+        black_wins = np.array([27.0, 2.0, 1.0])
+        self.assertTrue(decision_settled(visits, black_wins, 19, True))
+        self.assertFalse(decision_settled(visits, black_wins, 20, True))
+        self.assertTrue(decision_settled(visits, black_wins, 20, True,
+                                         confidence = 1.0))
+        self.assertFalse(decision_settled(visits, black_wins, 20, False,
+                                          confidence = 1.0))
+        visits[2] = 0
+        self.assertFalse(decision_settled(visits, black_wins, 20, True,
+                                          confidence = 1.0))
+
+    def test_early_stop(self):
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+        for row, col in [(4, 1), (1, 1), (1, 2)]:
+            goboard.play_move_gomoku(goboard.pt(row, col), WHITE)
+        goboard.current_player = BLACK
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 1000, exploration = 0.4,
+                             simulation_policy = "random", early_stop = 10)
+        self.assertEqual(move, goboard.pt(4, 6))
+        self.assertLess(mcts.tree.visits[NodeStore.ROOT], 1000)
+        self.assertEqual(mcts.tree.visits[NodeStore.ROOT] % 10, 0)
+
+    def test_early_stop_ignores_masked_children(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                      num_simulation = 98 * 3, exploration = 0.4,
+                      simulation_policy = "random")
+        # a child the next search may not choose is far ahead
+        masked = mcts.tree.find_child(NodeStore.ROOT, goboard.pt(4, 4))
+        mcts.tree.visits[masked] += 5000
+        visits = mcts.tree.visits[NodeStore.ROOT]
+        root_moves = [goboard.pt(1, 1), goboard.pt(7, 7)]
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 200, exploration = 0.4,
+                             simulation_policy = "random", early_stop = 10,
+                             root_moves = root_moves)
+        self.assertIn(move, root_moves)
+        self.assertGreater(mcts.tree.visits[NodeStore.ROOT] - visits, 10)
+
+    def test_forced_move_skips_the_search(self):
+        engine = Gomoku5(98 * 3, None, 'random', None)
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+        goboard.play_move_gomoku(goboard.pt(4, 1), WHITE)
+        goboard.current_player = WHITE
+        self.assertEqual(engine.get_move(goboard, WHITE), goboard.pt(4, 6))
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT], 0)
+        self.assertIsNone(engine.root_value())
+
+    def test_urgency(self):
+        engine = Gomoku5(98 * 3, None, 'random', None)
+        goboard = SimpleGoBoard(8)
+        for row in [2, 3, 4]:
+            goboard.play_move_gomoku(goboard.pt(row, 4), BLACK)
+        self.assertEqual(engine.urgency(goboard, BLACK), FORCED)
+        self.assertEqual(engine.urgency(goboard, WHITE), CRITICAL)
+        self.assertEqual(engine.urgency(SimpleGoBoard(8), BLACK), 1.0)
+
+    def test_root_moves(self):
+        goboard = SimpleGoBoard(7)
+        root_moves = [goboard.pt(1, 1), goboard.pt(7, 7)]
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 98 * 3, exploration = 0.4,
+                             simulation_policy = "random",
+                             root_moves = root_moves)
+        self.assertIn(move, root_moves)
+        children = mcts.tree.children(NodeStore.ROOT)
+        self.assertEqual(sorted(mcts.tree.move[children.start:children.stop]),
+                         root_moves)
+        # the children of a root expanded before are masked
+        masked = mcts.tree.find_child(NodeStore.ROOT, root_moves[1])
+        visits = mcts.tree.visits[masked]
+        mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                      num_simulation = 98 * 3, exploration = 0.4,
+                      simulation_policy = "random",
+                      root_moves = root_moves[:1])
+        self.assertEqual(mcts.best_move, root_moves[0])
+        self.assertEqual(mcts.tree.visits[masked], visits)
+
+
+class TreeReuseTestCase(unittest.TestCase):
+    """Tests for keeping the tree between the moves of a game"""
+
+    def play(self, engine, goboard, move, color):
+        goboard.play_move_gomoku(move, color)
+        engine.update(goboard, move, color)
+
+    def test_tree_follows_both_players(self):
+        engine = Gomoku5(98 * 3, None, 'random', None)
+        goboard = SimpleGoBoard(7)
+        move = engine.get_move(goboard, BLACK)
+        self.play(engine, goboard, move, BLACK)
+        tree = engine.MCTS.tree
+        children = tree.children(NodeStore.ROOT)
+        best = children.start + int(np.argmax(
+            tree.visits[children.start:children.stop]))
+        reply, kept = int(tree.move[best]), tree.visits[best]
+        self.assertGreater(kept, 0)
+        self.play(engine, goboard, reply, WHITE)
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT], kept)
+        engine.get_move(goboard, BLACK)
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT],
+                         kept + 98 * 3)
+
+    def test_tree_dropped_when_the_board_differs(self):
+        engine = Gomoku5(98 * 3, None, 'random', None)
+        goboard = SimpleGoBoard(7)
+        move = engine.get_move(goboard, BLACK)
+        self.play(engine, goboard, move, BLACK)
+        # a move the engine is not told about
+        goboard.play_move_gomoku(goboard.get_empty_points()[0], WHITE)
+        engine.get_move(goboard, BLACK)
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT], 98 * 3)
+
+    def test_pondering_keeps_the_reply_subtree(self):
+        engine = Gomoku5(98 * 3, None, 'random', None, ponder = True)
+        goboard = SimpleGoBoard(7)
+        move = engine.get_move(goboard, BLACK)
+        self.play(engine, goboard, move, BLACK)
+        engine.ponder(goboard, WHITE)
+        time.sleep(0.3)
+        engine.stop_pondering()
+        tree = engine.MCTS.tree
+        self.assertGreater(tree.visits[NodeStore.ROOT], 98 * 3)
+        children = tree.children(NodeStore.ROOT)
+        best = children.start + int(np.argmax(
+            tree.visits[children.start:children.stop]))
+        reply, kept = int(tree.move[best]), tree.visits[best]
+        self.play(engine, goboard, reply, WHITE)
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT], kept)
+        engine.get_move(goboard, BLACK)
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT],
+                         kept + 98 * 3)
+
+    def test_pondering_after_a_forced_move(self):
+        engine = Gomoku5(98 * 3, None, 'random', None, ponder = True)
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+        goboard.play_move_gomoku(goboard.pt(4, 1), WHITE)
+        move = engine.get_move(goboard, WHITE)
+        self.assertEqual(move, goboard.pt(4, 6))
+        self.play(engine, goboard, move, WHITE)
+        engine.ponder(goboard, BLACK)
+        time.sleep(0.2)
+        thread = engine.MCTS._ponder_thread
+        self.assertTrue(thread.is_alive())
+        engine.stop_pondering()
+        self.assertGreater(engine.MCTS.tree.visits[NodeStore.ROOT], 0)
+        self.assertEqual(engine.MCTS.simulation_policy, 'random')
+
+    def test_no_pondering_by_default(self):
+        engine = Gomoku5(98 * 3, None, 'random', None)
+        goboard = SimpleGoBoard(7)
+        engine.ponder(goboard, BLACK)
+        self.assertIsNone(engine.MCTS._ponder_thread)
+        self.assertEqual(engine.MCTS.tree.visits[NodeStore.ROOT], 0)
+
+
+class RootParallelTestCase(unittest.TestCase):
+    """Tests for the root parallel search of GomokuMCTS.py"""
+
+    def test_merge_roots(self):
+        tree = merge_roots([(np.array([10, PASS_MOVE]), np.array([3, 1]),
+                             np.array([1.0, 0.0])),
+                            (np.array([10, 11]), np.array([2, 4]),
+                             np.array([2.0, 1.0]))])
+        self.assertEqual(tree.visits[NodeStore.ROOT], 10)
+        self.assertEqual(tree.black_wins[NodeStore.ROOT], 4)
+        child = tree.find_child(NodeStore.ROOT, 10)
+        self.assertEqual(tree.visits[child], 5)
+        self.assertEqual(tree.black_wins[child], 3)
+        self.assertEqual(tree.parent[tree.find_child(NodeStore.ROOT, 11)],
+                         NodeStore.ROOT)
+
+    def test_workers_add_up_playouts(self):
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(1, col), WHITE)
+        mcts = MCTS()
+        with multiprocessing.Pool(2) as pool:
+            move = mcts.get_move(goboard, BLACK, limit = 100,
+                                 use_pattern = None, num_simulation = 98 * 3,
+                                 exploration = 0.4, simulation_policy = None,
+                                 pool = pool, workers = 2)
+        self.assertIn(move, [goboard.pt(4, 1), goboard.pt(4, 6)])
+        self.assertEqual(mcts.tree.visits[NodeStore.ROOT], 2 * 98 * 3)
+        self.assertEqual(goboard.move_history, [])
+
+    def test_second_search_adds_to_the_first(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        with multiprocessing.Pool(2) as pool:
+            for _ in range(2):
+                mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                              num_simulation = 98 * 3, exploration = 0.4,
+                              simulation_policy = "random",
+                              pool = pool, workers = 2)
+        self.assertEqual(mcts.tree.visits[NodeStore.ROOT], 2 * 2 * 98 * 3)
+
+    def test_engine_pool_shutdown(self):
+        engine = Gomoku5(98 * 3, None, None, None)
+        engine.set_workers(2)
+        goboard = SimpleGoBoard(7)
+        move = engine.get_move(goboard, BLACK)
+        self.assertIn(move, list(goboard.get_empty_points()))
+        self.assertIsNotNone(engine._pool)
+        engine.set_workers(1)
+        self.assertIsNone(engine._pool)
+        engine.shutdown()
+
+
+class TreeParallelTestCase(unittest.TestCase):
+    """Tests for the tree parallel search of GomokuMCTS.py"""
+
+    def search(self, batch_size, processes = 1):
+        goboard = SimpleGoBoard(7)
+        for col in [2, 3, 4, 5]:
+            goboard.play_move_gomoku(goboard.pt(4, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(1, col), WHITE)
+        mcts = MCTS()
+        move = mcts.get_move(goboard, BLACK, limit = 100, use_pattern = None,
+                             num_simulation = 98 * 3, exploration = 0.4,
+                             simulation_policy = "rule_based",
+                             batch_size = batch_size, threads = 4,
+                             processes = processes)
+        self.assertIn(move, [goboard.pt(4, 1), goboard.pt(4, 6)])
+        self.assertEqual(goboard.move_history, [])
+        return mcts.tree
+
+    def assert_losses_reverted(self, tree):
+        self.assertEqual(tree.visits[NodeStore.ROOT], 98 * 3)
+        for node in range(len(tree)):
+            visits, black_wins = tree.visits[node], tree.black_wins[node]
+            self.assertEqual(black_wins, int(black_wins))
+            self.assertTrue(0 <= black_wins <= visits)
+            children = tree.children(node)
+            self.assertLessEqual(
+                tree.visits[children.start:children.stop].sum(), visits)
+
+    def test_threads_share_the_tree(self):
+        self.assert_losses_reverted(self.search(1))
+
+    def test_threads_with_batches(self):
+        self.assert_losses_reverted(self.search(16))
+
+    def test_processes_share_the_tree(self):
+        tree = self.search(1, processes = 2)
+        self.assert_losses_reverted(tree)
+        self.assertIs(type(tree), NodeStore)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
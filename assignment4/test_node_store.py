@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import pickle
+import multiprocessing
+import numpy as np
+from board_util import BLACK, WHITE
+from node_store import NodeStore, SharedNodeStore, NO_NODE, PASS_MOVE
+
+ROOT = NodeStore.ROOT
+
+class NodeStoreTestCase(unittest.TestCase):
+    """Tests for node_store.py"""
+
+    def small_tree(self):
+        """ root -> 10, 11, pass; 11 -> 20, 21; 21 -> 30 """
+        tree = NodeStore(capacity = 2)
+        tree.expand(ROOT, [10, 11, PASS_MOVE])
+        node_11 = tree.find_child(ROOT, 11)
+        tree.expand(node_11, [20, 21])
+        node_21 = tree.find_child(node_11, 21)
+        tree.expand(node_21, [30])
+        return tree, node_11, node_21
+
+    def test_children_are_contiguous(self):
+        tree, node_11, node_21 = self.small_tree()
+        self.assertEqual(len(tree), 7)
+        self.assertEqual(list(tree.move[tree.children(ROOT).start:
+                                        tree.children(ROOT).stop]),
+                         [10, 11, PASS_MOVE])
+        self.assertEqual(tree.parent[node_21], node_11)
+        self.assertEqual(tree.find_child(ROOT, 12), NO_NODE)
+        self.assertTrue(tree.is_leaf(tree.find_child(ROOT, 10)))
+
+    def test_update_along_the_path(self):
+        tree, node_11, node_21 = self.small_tree()
+        self.assertEqual(tree.path_to(node_21), [ROOT, node_11, node_21])
+        tree.update(tree.path_to(node_21), 1)
+        tree.update([ROOT, node_11], 0)
+        tree.update([ROOT, node_11, node_21], 0.5, visits = 0)
+        self.assertEqual(list(tree.visits[[ROOT, node_11, node_21]]), [2, 2, 1])
+        self.assertEqual(list(tree.black_wins[[ROOT, node_11, node_21]]),
+                         [1.5, 1.5, 1.5])
+        tree.update([ROOT, node_11], np.array([1, 0]), visits = 0)
+        self.assertEqual(list(tree.black_wins[[ROOT, node_11]]), [2.5, 1.5])
+
+    def test_update_amaf(self):
+        tree, node_11, node_21 = self.small_tree()
+        board = np.zeros(40, dtype = np.int32)
+        # black played 11 and 30, white played 21 and 10
+        board[[11, 30]] = BLACK
+        board[[21, 10]] = WHITE
+        tree.update_amaf([ROOT, node_11], BLACK, board, 1)
+        amaf = lambda node, move: tree.find_child(node, move)
+        # black to play at the root: 11 was played by black, 10 by white
+        self.assertEqual(tree.amaf_visits[amaf(ROOT, 11)], 1)
+        self.assertEqual(tree.amaf_black_wins[amaf(ROOT, 11)], 1)
+        self.assertEqual(tree.amaf_visits[amaf(ROOT, 10)], 0)
+        self.assertEqual(tree.amaf_visits[amaf(ROOT, PASS_MOVE)], 0)
+        # white to play at node 11
+        self.assertEqual(tree.amaf_visits[amaf(node_11, 21)], 1)
+        self.assertEqual(tree.amaf_visits[amaf(node_11, 20)], 0)
+        self.assertEqual(tree.amaf_visits[amaf(node_21, 30)], 0)
+
+    def test_subtree(self):
+        tree, node_11, node_21 = self.small_tree()
+        tree.update(tree.path_to(tree.find_child(node_21, 30)), 1)
+        subtree = tree.subtree(node_11)
+        self.assertEqual(len(subtree), 4)
+        self.assertEqual(subtree.visits[ROOT], 1)
+        self.assertEqual(subtree.parent[ROOT], NO_NODE)
+        new_21 = subtree.find_child(ROOT, 21)
+        new_30 = subtree.find_child(new_21, 30)
+        self.assertEqual(subtree.black_wins[new_30], 1)
+        self.assertEqual(subtree.parent[new_30], new_21)
+        self.assertEqual(subtree.depth_counts(4), [1, 1, 0, 0])
+        self.assertEqual(tree.depth_counts(4), [1, 1, 1, 0])
+
+    def test_pickle_keeps_only_used_nodes(self):
+        tree, node_11, node_21 = self.small_tree()
+        tree.update(tree.path_to(node_21), 1)
+        loaded = pickle.loads(pickle.dumps(tree))
+        self.assertEqual(len(loaded.visits), len(tree))
+        self.assertEqual(list(loaded.black_wins[:len(tree)]),
+                         list(tree.black_wins[:len(tree)]))
+        loaded.expand(loaded.find_child(ROOT, 10), [40, 41])
+        self.assertEqual(len(loaded), 9)
+        self.assertEqual(tree.nbytes, 7 * 48)
+
+    def test_shared_tree_is_changed_by_other_processes(self):
+        tree, node_11, node_21 = self.small_tree()
+        shared = SharedNodeStore(tree, 10)
+        self.assertEqual(len(shared), 7)
+        self.assertEqual(list(shared.move[:7]), list(tree.move[:7]))
+        self.assertTrue(shared.has_room(3))
+        self.assertFalse(shared.has_room(4))
+        process = multiprocessing.Process(target = _expand_10,
+                                          args = (shared,))
+        process.start()
+        process.join()
+        self.assertEqual(len(shared), 9)
+        node_10 = shared.find_child(ROOT, 10)
+        self.assertEqual(list(shared.move[shared.children(node_10).start:
+                                          shared.children(node_10).stop]),
+                         [40, 41])
+        self.assertEqual(shared.visits[node_10], 1)
+        self.assertEqual(len(shared.subtree(ROOT)), 9)
+
+
+def _expand_10(shared):
+    """ Expand node 10 of shared in another process """
+    node_10 = shared.find_child(ROOT, 10)
+    shared.expand(node_10, [40, 41])
+    shared.update(shared.path_to(node_10), 1)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
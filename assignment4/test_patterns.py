@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+import random
+import os
+import tempfile
+import numpy as np
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard, PATTERN_SCORES, RANDOM
+from pattern_compiler import parse_patterns, compile_patterns, \
+                             load_patterns, PatternError, CODE_WEIGHTS
+
+class PatternTestCase(unittest.TestCase):
+    """Tests for the pattern engine of simple_board.py"""
+
+    def play_row(self, goboard, row, cols, color):
+        for col in cols:
+            goboard.play_move_gomoku(goboard.pt(row, col), color)
+
+    def test_empty_board_prefers_center(self):
+        goboard = SimpleGoBoard(7)
+        self.assertEqual(goboard.get_pattern_moves(),
+                         ([goboard.pt(4, 4)], 4))
+
+    def test_winning_point(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 2, [1, 2, 3, 4], BLACK)
+        self.play_row(goboard, 6, [2, 4, 6], WHITE)
+        moves, score = goboard.get_pattern_moves()
+        self.assertEqual(moves, [goboard.pt(2, 5)])
+        self.assertGreater(score, PATTERN_SCORES[0])
+        move_sets = goboard.pattern_move_sets(BLACK)
+        self.assertEqual(move_sets[0], [goboard.pt(2, 5)])
+
+    def test_blocking_point_for_white(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 4, [2, 3, 4, 5], BLACK)
+        goboard.current_player = WHITE
+        move_sets = goboard.pattern_move_sets(WHITE)
+        self.assertEqual(move_sets[0], [])
+        self.assertEqual(sorted(move_sets[1]),
+                         [goboard.pt(4, 1), goboard.pt(4, 6)])
+        moves, _ = goboard.get_pattern_moves()
+        self.assertIn(moves[0], [goboard.pt(4, 1), goboard.pt(4, 6)])
+
+    def test_scores_count_every_pattern(self):
+        goboard = SimpleGoBoard(7)
+        self.play_row(goboard, 4, [2, 3, 4, 5], BLACK)
+        move_sets = goboard.pattern_move_sets(BLACK)
+        scores = goboard.pattern_scores(BLACK)
+        for point in [goboard.pt(4, 1), goboard.pt(4, 6)]:
+            expected = sum(PATTERN_SCORES[category] * moves.count(point)
+                           for category, moves in enumerate(move_sets))
+            self.assertEqual(scores[point], expected)
+
+    def test_scores_maintained_by_play_and_undo(self):
+        rng = random.Random(11)
+        for size in [5, 7, 9]:
+            goboard = SimpleGoBoard(size)
+            for _ in range(200):
+                empty = list(goboard.get_empty_points())
+                if goboard.move_history and (not empty or rng.random() < 0.4):
+                    goboard.pop_move()
+                else:
+                    goboard.push_move(rng.choice(empty),
+                                      goboard.current_player)
+                goboard.get_pattern_moves()
+                goboard._update_score_board()
+                fresh = goboard.copy()
+                fresh._initialize_score_board()
+                self.assertEqual(list(goboard.score_black),
+                                 list(fresh.score_black))
+                self.assertEqual(list(goboard.score_white),
+                                 list(fresh.score_white))
+
+    def test_copy_scores_are_independent(self):
+        goboard = SimpleGoBoard(7)
+        goboard.get_pattern_moves()
+        board_copy = goboard.copy()
+        board_copy.play_move_gomoku(goboard.pt(4, 4), BLACK)
+        board_copy.get_pattern_moves()
+        self.assertEqual(goboard.get_pattern_moves(),
+                         ([goboard.pt(4, 4)], 4))
+
+    def test_full_board(self):
+        goboard = SimpleGoBoard(2)
+        for point in list(goboard.get_empty_points()):
+            goboard.play_move_gomoku(point, BLACK)
+        self.assertEqual(goboard.get_pattern_moves(), ([None], None))
+
+
+class ThreatTestCase(unittest.TestCase):
+    """Tests for threat_moves and list_solve_point of simple_board.py"""
+
+    def board(self, moves, size = 7):
+        goboard = SimpleGoBoard(size)
+        for row, col, color in moves:
+            goboard.play_move_gomoku(goboard.pt(row, col), color)
+        return goboard
+
+    def test_no_threat(self):
+        goboard = self.board([(4, 4, BLACK)])
+        category, moves = goboard.threat_moves()
+        self.assertEqual(category, RANDOM)
+        self.assertEqual(moves, list(goboard.get_empty_points()))
+        self.assertEqual(goboard.list_solve_point(), None)
+
+    def test_win_before_block(self):
+        goboard = self.board([(1, 1, BLACK), (2, 1, WHITE), (1, 2, BLACK),
+                              (2, 2, WHITE), (1, 3, BLACK), (2, 3, WHITE),
+                              (1, 4, BLACK), (2, 4, WHITE)])
+        self.assertEqual(goboard.threat_moves(),
+                         ('Win', [goboard.pt(1, 5)]))
+        self.assertEqual(goboard.threat_moves(WHITE),
+                         ('Win', [goboard.pt(2, 5)]))
+        self.assertEqual(goboard.list_solve_point(), [goboard.pt(1, 5)])
+
+    def test_block_open_four(self):
+        goboard = self.board([(2, 4, BLACK), (3, 4, BLACK), (4, 4, BLACK)],
+                             size = 8)
+        self.assertEqual(goboard.threat_moves(WHITE),
+                         ('BlockOpenFour', [goboard.pt(1, 4), goboard.pt(5, 4)]))
+        self.assertEqual(goboard.threat_moves(BLACK),
+                         ('OpenFour', [goboard.pt(5, 4)]))
+
+    def test_follows_play_and_undo(self):
+        goboard = self.board([(3, 2, BLACK), (3, 3, BLACK), (3, 4, BLACK),
+                              (3, 5, BLACK)])
+        self.assertEqual(goboard.threat_moves(WHITE)[0], 'BlockWin')
+        goboard.undo(goboard.pt(3, 5))
+        self.assertEqual(goboard.threat_moves(WHITE)[0], 'BlockOpenFour')
+
+
+class ForcedMovesTestCase(unittest.TestCase):
+    """Tests for forced_moves of simple_board.py"""
+
+    def board(self, black, white, size = 9):
+        goboard = SimpleGoBoard(size)
+        for row, col in black:
+            goboard.play_move_gomoku(goboard.pt(row, col), BLACK)
+        for row, col in white:
+            goboard.play_move_gomoku(goboard.pt(row, col), WHITE)
+        goboard.current_player = BLACK
+        return goboard
+
+    def test_win_and_block(self):
+        goboard = self.board([(5, 2), (5, 3), (5, 4), (5, 5)],
+                             [(5, 1), (1, 1), (1, 2), (1, 3), (1, 4)])
+        self.assertEqual(goboard.forced_moves(BLACK),
+                         (goboard.pt(5, 6), [goboard.pt(5, 6)]))
+        self.assertEqual(goboard.forced_moves(WHITE),
+                         (goboard.pt(1, 5), [goboard.pt(1, 5)]))
+        goboard = self.board([(5, 2), (5, 3), (5, 4), (5, 5)],
+                             [(5, 1), (1, 1), (9, 9)])
+        self.assertEqual(goboard.forced_moves(WHITE),
+                         (goboard.pt(5, 6), [goboard.pt(5, 6)]))
+
+    def test_four_three(self):
+        goboard = self.board([(5, 2), (5, 3), (5, 4), (3, 5), (4, 5)],
+                             [(5, 1), (1, 1), (1, 9), (9, 9), (9, 1)])
+        self.assertEqual(goboard.threat_moves(BLACK)[0], RANDOM)
+        self.assertEqual(goboard.forced_moves(BLACK),
+                         (goboard.pt(5, 5), [goboard.pt(5, 5)]))
+        self.assertEqual(goboard.move_history, [])
+
+    def test_non_losing_moves(self):
+        goboard = self.board([(5, 3), (5, 4), (5, 5), (8, 1)],
+                             [(8, 2), (8, 3), (8, 4)])
+        # stop the open three of black, or make a four black must answer
+        self.assertEqual(goboard.forced_moves(WHITE),
+                         (None, sorted([goboard.pt(5, 2), goboard.pt(5, 6),
+                                        goboard.pt(8, 5), goboard.pt(8, 6)])))
+        goboard = self.board([(5, 5)], [])
+        self.assertEqual(goboard.forced_moves(WHITE),
+                         (None, goboard.get_empty_points().tolist()))
+
+
+class PatternCompilerTestCase(unittest.TestCase):
+    """Tests for pattern_compiler.py"""
+
+    source = """
+    category win 100   # comment
+    category block_win 50
+    win xxxx. 4
+    swap win block_win
+    category dead_two 1
+    dead_two Ox.... 2
+    """
+
+    def test_expands_mirrors_swaps_and_classes(self):
+        names, scores, patterns = parse_patterns(self.source)
+        self.assertEqual(names, ['win', 'block_win', 'dead_two'])
+        self.assertEqual(scores, [100, 50, 1])
+        self.assertEqual(patterns[0], {'xxxx.': {4}, '.xxxx': {0}})
+        self.assertEqual(patterns[1], {'oooo.': {4}, '.oooo': {0}})
+        self.assertEqual(patterns[2], {'ox....': {2}, 'Bx....': {2},
+                                       '....xo': {3}, '....xB': {3}})
+
+    def test_errors_name_the_line(self):
+        for source in ["category win 1\nwin xxxx. 3",
+                       "category win 1\nwin xxyx. 4",
+                       "lose xxxx. 4"]:
+            with self.assertRaises(PatternError) as context:
+                parse_patterns(source)
+            self.assertIn("line", str(context.exception))
+
+    def test_tables_count_patterns_for_each_player(self):
+        _, scores, patterns = parse_patterns(self.source)
+        counts, code_scores = compile_patterns(scores, patterns)
+        # black stones on the first four points of the window, then empty
+        code = int(np.array([1, 1, 1, 1, 0, 0, 0]) @ CODE_WEIGHTS)
+        self.assertEqual(counts[code, BLACK - 1, 0, 4], 1)
+        self.assertEqual(counts[code, WHITE - 1, 1, 4], 1)
+        self.assertEqual(code_scores[code, BLACK - 1, 4], 100)
+        self.assertEqual(code_scores[code, WHITE - 1, 4], 50)
+
+    def test_tables_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'patterns.txt')
+            with open(path, 'w') as f:
+                f.write(self.source)
+            compiled = load_patterns(path)
+            self.assertEqual(len(os.listdir(
+                os.path.join(directory, '__pycache__'))), 2)
+            loaded = load_patterns(path)
+            self.assertEqual(loaded[:2], compiled[:2])
+            self.assertTrue((loaded[3] == compiled[3]).all())
+            self.assertFalse(loaded[3].flags.writeable)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+#/usr/local/bin/python3
+# Set the path to your python3 above
+
+import unittest
+from board_util import BLACK, WHITE
+from time_manager import TimeManager, FORCED, CRITICAL, MIN_MOVES_LEFT, \
+                         MAX_SHARE, EXTENSION
+
+class TimeManagerTestCase(unittest.TestCase):
+    """Tests for time_manager.py"""
+
+    def test_move_time_is_a_hard_limit(self):
+        manager = TimeManager(10)
+        self.assertEqual(manager.budget(BLACK, 49), 10)
+        self.assertEqual(manager.budget(BLACK, 49, CRITICAL), 10)
+        self.assertEqual(manager.budget(BLACK, 49, FORCED), 10 * FORCED)
+        self.assertEqual(manager.extension(BLACK, 49, 0.5), 0)
+
+    def test_main_time_spread_over_the_moves_left(self):
+        manager = TimeManager(10)
+        manager.time_settings(300, 0, 0)
+        self.assertEqual(manager.budget(BLACK, 40), 300 / 20)
+        self.assertEqual(manager.budget(BLACK, 40, CRITICAL),
+                         300 / 20 * CRITICAL)
+        self.assertEqual(manager.budget(BLACK, 40, FORCED), 300 / 20 * FORCED)
+        self.assertEqual(manager.budget(BLACK, 2), 300 / MIN_MOVES_LEFT)
+        self.assertEqual(manager.budget(BLACK, 2, CRITICAL), 300 * MAX_SHARE)
+        self.assertEqual(manager.extension(BLACK, 40, 0.45),
+                         EXTENSION * 300 / 20)
+        self.assertEqual(manager.extension(BLACK, 40, 0.9), 0)
+        manager.used(BLACK, 100)
+        self.assertEqual(manager.budget(BLACK, 40), 200 / 20)
+        self.assertEqual(manager.budget(WHITE, 40), 300 / 20)
+
+    def test_byo_yomi(self):
+        manager = TimeManager(10)
+        manager.time_settings(10, 30, 3)
+        self.assertEqual(manager.budget(BLACK, 40), 10 / 20 + 10)
+        manager.used(BLACK, 12)
+        self.assertEqual((manager.left[BLACK], manager.stones_left[BLACK]),
+                         (30, 3))
+        self.assertEqual(manager.budget(BLACK, 40), 10)
+        self.assertEqual(manager.budget(BLACK, 40, CRITICAL), 10)
+        for _ in range(3):
+            manager.used(BLACK, 5)
+        # a new period starts after its stones are played
+        self.assertEqual((manager.left[BLACK], manager.stones_left[BLACK]),
+                         (30, 3))
+
+    def test_time_left_and_no_limit(self):
+        manager = TimeManager(10)
+        manager.time_settings(300, 0, 0)
+        manager.time_left(WHITE, 20, 2)
+        self.assertEqual(manager.budget(WHITE, 40), 10)
+        manager.time_settings(0, 1, 0)
+        self.assertEqual(manager.budget(WHITE, 40, CRITICAL), 10)
+
+
+"""Main"""
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+time_manager.py
+
+Decides how many seconds genmove may search.
+
+Without a game clock, every move gets move_time, the limit of the
+timelimit command, and never more: it is a hard limit per move.
+After the GTP time_settings command, each player has main time, then
+byo-yomi periods of byo_yomi_time seconds for byo_yomi_stones moves.
+The time left of a player is spread over the moves the player still has
+to play, estimated from the number of empty points, and scaled by the
+urgency of the position:
+FORCED      a forced move: a win, the block of a win or an open four
+CRITICAL    an open four to stop
+1           any other position
+In byo-yomi, the time of the period is spread over its moves.
+The clock follows the time_left commands of the controller, and the
+search time reported by used in between.
+"""
+
+from board_util import BLACK, WHITE
+
+FORCED = 0.2
+CRITICAL = 2.0
+
+"""
+MIN_MOVES_LEFT: the main time is spread over at least that many moves.
+MAX_SHARE: the largest part of the main time left spent on one move.
+UNSETTLED, EXTENSION: a move whose search value is within UNSETTLED of
+0.5, a draw, gets EXTENSION times its budget more, see extension.
+"""
+MIN_MOVES_LEFT = 5
+MAX_SHARE = 0.25
+UNSETTLED = 0.1
+EXTENSION = 0.5
+
+class TimeManager(object):
+
+    def __init__(self, move_time):
+        self.move_time = move_time
+        self.main_time = None
+        self.byo_yomi_time = 0
+        self.byo_yomi_stones = 0
+        # seconds left, and moves left in the byo-yomi period, 0 in main time
+        self.left = {BLACK: 0.0, WHITE: 0.0}
+        self.stones_left = {BLACK: 0, WHITE: 0}
+
+    def time_settings(self, main_time, byo_yomi_time, byo_yomi_stones):
+        """
+        Start the clocks of both players, as the GTP time_settings
+        command. byo_yomi_time > 0 with 0 byo_yomi_stones means no time
+        limit, the fixed move_time is used again.
+        """
+        if byo_yomi_time > 0 and byo_yomi_stones == 0:
+            self.main_time = None
+            return
+        self.main_time = main_time
+        self.byo_yomi_time = byo_yomi_time
+        self.byo_yomi_stones = byo_yomi_stones
+        for color in (BLACK, WHITE):
+            self.left[color] = float(main_time)
+            self.stones_left[color] = 0
+            if main_time <= 0:
+                self._start_period(color)
+
+    def time_left(self, color, seconds, stones):
+        """
+        Set the clock of color, as the GTP time_left command:
+        stones 0 for main time, otherwise the moves left in the period.
+        """
+        self.left[color] = float(seconds)
+        self.stones_left[color] = stones
+
+    def _start_period(self, color):
+        if self.byo_yomi_stones > 0:
+            self.left[color] = float(self.byo_yomi_time)
+            self.stones_left[color] = self.byo_yomi_stones
+
+    def used(self, color, seconds):
+        """ Take the seconds color spent on a move off its clock """
+        if self.main_time is None:
+            return
+        self.left[color] -= seconds
+        if self.stones_left[color] > 0:
+            self.stones_left[color] -= 1
+            if self.stones_left[color] == 0 and self.left[color] >= 0:
+                self._start_period(color)
+        elif self.left[color] <= 0:
+            self._start_period(color)
+
+    def budget(self, color, empty_points, urgency = 1.0):
+        """
+        The seconds color may search for its next move, with empty_points
+        empty points on the board, see the module documentation.
+        """
+        if self.main_time is None:
+            return self.move_time * min(urgency, 1.0)
+        left = max(self.left[color], 0.0)
+        if self.stones_left[color] > 0:
+            return left / self.stones_left[color] * min(urgency, 1.0)
+        per_stone = 0.0
+        if self.byo_yomi_stones > 0:
+            per_stone = self.byo_yomi_time / self.byo_yomi_stones
+        moves = max(empty_points // 2, MIN_MOVES_LEFT)
+        return min(left / moves * urgency, left * MAX_SHARE) + per_stone
+
+    def extension(self, color, empty_points, value):
+        """
+        The extra seconds for a move whose search value, the win rate of
+        the best move or 0.5 for an unknown result, is close to 0.5.
+        Only with a game clock, move_time is a hard limit.
+        """
+        if self.main_time is None or value is None or \
+                abs(value - 0.5) >= UNSETTLED:
+            return 0.0
+        return EXTENSION * self.budget(color, empty_points)
@@ -0,0 +1,50 @@
+"""
+conftest.py
+
+Every assignment directory is a standalone program with its own copy of
+board_util.py, simple_board.py, gtp_connection.py, ... which all import
+each other by plain module name.  When pytest is run from the top of the
+repository, give each directory its own set of those modules so a test
+never picks up the copy from another assignment.
+"""
+
+import os
+import sys
+
+_modules_of_dir = {}
+_current_dir = [None]
+
+
+def _local_module_names(directory):
+    names = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == directory:
+            names.append(name)
+    return names
+
+
+def _switch_to(directory):
+    if directory == _current_dir[0]:
+        return
+    previous = _current_dir[0]
+    if previous is not None:
+        saved = {}
+        for name in _local_module_names(previous):
+            saved[name] = sys.modules.pop(name)
+        _modules_of_dir[previous] = saved
+        if previous in sys.path:
+            sys.path.remove(previous)
+    sys.modules.update(_modules_of_dir.get(directory, {}))
+    sys.path.insert(0, directory)
+    _current_dir[0] = directory
+
+
+def pytest_collectstart(collector):
+    path = getattr(collector, 'path', None)
+    if path is not None and path.suffix == '.py':
+        _switch_to(os.path.dirname(str(path)))
+
+
+def pytest_runtest_setup(item):
+    _switch_to(os.path.dirname(str(item.path)))